@@ -0,0 +1,426 @@
+"""
+End-to-end benchmarks of the bot's cogs against a fake guild.
+
+Each scenario builds a synthetic roster, drives one cog through the fake
+Discord objects in benchmarks/harness.py and reports throughput, p50/p99
+latency and peak RSS:
+
+    tracking   link messages through the dispatcher into TrackingCog
+               (ops/s and latency: handler time; drain_ms: until every
+               link is durable; durable_*: message to its ✅ reaction)
+    setup      "username, target, date" replies into SetupCog
+    dashboard  AdminDashboardCog /dashboard
+    getall     AdminCommandsCog /getall (cold compiles; cached_ms: reuse)
+    cleanup    CleanupCog.cleanup_loop reconciliation passes after a
+               share of the roster lost the role or left
+
+Every (scenario, roster size) runs in its own subprocess and working
+directory so peak RSS and on-disk state do not leak between runs. Traffic
+is seeded, and `--json` saves the results with the git revision, so runs
+on two commits can be compared with `--compare`.
+
+Usage (from the bot directory):
+    python -m benchmarks.bench_bot [--scenarios tracking,cleanup]
+        [--users 10,100,1000,10000] [--messages 5000] [--seed 1]
+        [--api-latency 0.0] [--set STORAGE_BACKEND=sqlite]
+        [--json results.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+from benchmarks.bench_links import make_corpus
+from benchmarks.harness import (BOT_DIR, FakeGuild, FakeInteraction,
+                                FakeMessage, load_bot, start_bot, stop_bot)
+
+SCENARIOS = ("tracking", "setup", "dashboard", "getall", "cleanup")
+DEFAULT_USERS = "10,100,1000,10000"
+USER_ID_BASE = 10**12
+START_DATE = date(2026, 1, 1)
+
+# Config for every run: no HTTP endpoint, and member events never start a
+# debounced cleanup behind the scenario's back
+BASE_OVERRIDES = {"METRICS_PORT": "", "CLEANUP_DEBOUNCE_SECONDS": "3600"}
+
+
+# ---------------------------------------------------------------------------
+# Helpers
+# ---------------------------------------------------------------------------
+def _percentile(values, q: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+
+def _ms(seconds: float) -> float:
+    return round(seconds * 1000, 3)
+
+
+def _peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return round(peak / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+
+def _result(ops: int, seconds: float, latencies, **extra) -> dict:
+    return {
+        "ops": ops,
+        "seconds": round(seconds, 4),
+        "throughput": round(ops / seconds, 2) if seconds else 0.0,
+        "p50_ms": _ms(_percentile(latencies, 0.50)),
+        "p99_ms": _ms(_percentile(latencies, 0.99)),
+        "extra": extra,
+    }
+
+
+def _populate(bot, guild, users: int, status: str = "active") -> list:
+    """Roster of `users` role members with channels, stored in one write."""
+    roster, entries = [], {}
+    for i in range(users):
+        member = guild.add_member(USER_ID_BASE + i, f"user{i:05d}")
+        channel = guild.add_channel(f"{member.name}-replies")
+        roster.append((member, channel))
+        entries[str(member.id)] = dict(channel_id=channel.id,
+                                       username=member.display_name,
+                                       replies_per_day=5,
+                                       status=status,
+                                       start_date=START_DATE)
+    bot.storage.add_users(entries)
+    return roster
+
+
+async def _build_reports(bot, roster) -> None:
+    await asyncio.gather(*(bot.reports.rebuild(str(member.id))
+                           for member, _ in roster))
+
+
+# ---------------------------------------------------------------------------
+# Scenarios
+# ---------------------------------------------------------------------------
+async def bench_tracking(bot, guild, users: int, args) -> dict:
+    roster = _populate(bot, guild, users)
+    rng = random.Random(args.seed)
+    corpus = make_corpus(args.messages, args.seed)
+    # a few heavy posters, a long tail of occasional ones
+    weights = [1 / (rank + 1) for rank in range(len(roster))]
+    authors = rng.choices(roster, weights, k=len(corpus))
+    messages = [FakeMessage(member, channel, text)
+                for (member, channel), text in zip(authors, corpus)]
+
+    tracking = bot.get_cog("TrackingCog")
+    handler = []
+    started = time.perf_counter()
+    for message in messages:
+        message.sent_at = t0 = time.perf_counter()
+        await bot.dispatcher.on_message(message)
+        handler.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+    # then wait for every batch to be durable (LINK_FLUSH_SECONDS apart)
+    while tracking._pending:
+        await asyncio.gather(*list(tracking._pending))
+    drained = time.perf_counter() - started
+
+    durable = [at - m.sent_at for m in messages
+               for emoji, at in m.reactions if emoji == "✅"]
+    return _result(len(messages), elapsed, handler,
+                   drain_ms=_ms(drained),
+                   durable_p50_ms=_ms(_percentile(durable, 0.50)),
+                   durable_p99_ms=_ms(_percentile(durable, 0.99)),
+                   links=bot.metrics.snapshot()["counters"].get(
+                       "links.recorded", 0))
+
+
+async def bench_setup(bot, guild, users: int, args) -> dict:
+    roster = _populate(bot, guild, users, status="pending")
+    sample = random.Random(args.seed).sample(roster,
+                                             min(users, args.setups))
+    latencies = []
+    started = time.perf_counter()
+    for member, channel in sample:
+        message = FakeMessage(member, channel,
+                              f"{member.name}, 5, {START_DATE.isoformat()}")
+        t0 = time.perf_counter()
+        await bot.dispatcher.on_message(message)
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    active = sum(1 for u in bot.storage.list_users()
+                 if u.status == "active")
+    return _result(len(sample), elapsed, latencies, activated=active)
+
+
+async def bench_dashboard(bot, guild, users: int, args) -> dict:
+    from utils.event_store import LinkEvent
+
+    roster = _populate(bot, guild, users)
+    rng = random.Random(args.seed)
+    for member, _ in roster:
+        uid = str(member.id)
+        bot.counters.add(uid, [
+            LinkEvent(uid, (START_DATE + timedelta(days=rng.randrange(30))
+                            ).isoformat(), str(n), str(n), 0)
+            for n in range(rng.randrange(60))
+        ])
+
+    cog = bot.get_cog("AdminDashboardCog")
+    admin = guild.add_member(_admin_id(), "admin", tracked=False)
+    latencies = []
+    started = time.perf_counter()
+    for _ in range(args.repeat):
+        interaction = FakeInteraction(admin, guild)
+        t0 = time.perf_counter()
+        await cog.dashboard.callback(cog, interaction)
+        latencies.append(time.perf_counter() - t0)
+    return _result(args.repeat, time.perf_counter() - started, latencies)
+
+
+async def bench_getall(bot, guild, users: int, args) -> dict:
+    from cogs.admin_commands_cog import MASTER_CACHE
+
+    roster = _populate(bot, guild, users)
+    await _build_reports(bot, roster[:args.reports])
+
+    cog = bot.get_cog("AdminCommandsCog")
+    admin = guild.add_member(_admin_id(), "admin", tracked=False)
+    latencies = []
+    cold_runs = max(1, args.repeat // 10)
+    started = time.perf_counter()
+    for _ in range(cold_runs):
+        MASTER_CACHE.unlink(missing_ok=True)  # force a compile
+        t0 = time.perf_counter()
+        await cog.getall.callback(cog, FakeInteraction(admin, guild))
+        latencies.append(time.perf_counter() - t0)
+    elapsed = time.perf_counter() - started
+
+    t0 = time.perf_counter()
+    await cog.getall.callback(cog, FakeInteraction(admin, guild))
+    cached = time.perf_counter() - t0
+    return _result(cold_runs, elapsed, latencies,
+                   reports=min(users, args.reports), cached_ms=_ms(cached))
+
+
+async def bench_cleanup(bot, guild, users: int, args) -> dict:
+    roster = _populate(bot, guild, users)
+    rng = random.Random(args.seed)
+    departed = rng.sample(roster, int(users * args.departed))
+    for i, (member, _) in enumerate(departed):
+        if i % 2:
+            guild.members.pop(member.id)  # left the server
+        guild.remove_role(member)  # lost the role
+    await _build_reports(bot, departed[:args.reports])
+
+    cog = bot.get_cog("CleanupCog")
+    passes = []
+    for _ in range(max(2, args.repeat // 10)):
+        await cog.on_ready()  # (re)connect: everyone is rechecked
+        t0 = time.perf_counter()
+        await cog.cleanup_loop.coro(cog)
+        passes.append(time.perf_counter() - t0)
+
+    remaining = len(bot.storage.list_users())
+    return _result(users, passes[0], passes,
+                   removed=users - remaining,
+                   steady_p50_ms=_ms(statistics.median(passes[1:])))
+
+
+_admin_ids = iter(range(USER_ID_BASE - 1, 0, -1))
+
+
+def _admin_id() -> int:
+    return next(_admin_ids)
+
+
+BENCHES = {
+    "tracking": bench_tracking,
+    "setup": bench_setup,
+    "dashboard": bench_dashboard,
+    "getall": bench_getall,
+    "cleanup": bench_cleanup,
+}
+
+
+# ---------------------------------------------------------------------------
+# Worker (one scenario, one roster size, one process)
+# ---------------------------------------------------------------------------
+async def _run_worker(scenario: str, users: int, args) -> dict:
+    overrides = dict(BASE_OVERRIDES, **_parse_overrides(args.set))
+    bot = load_bot(overrides)
+    async with bot:
+        await start_bot(bot)
+        guild = FakeGuild.attach(bot, api_latency=args.api_latency)
+        result = await BENCHES[scenario](bot, guild, users, args)
+        timers = bot.metrics.snapshot()["timers"]
+        await stop_bot(bot)
+    result["metrics"] = {
+        name: {"count": t["count"], "p50_ms": _ms(t["p50"]),
+               "p99_ms": _ms(t["p99"])}
+        for name, t in sorted(timers.items())
+    }
+    result.update(scenario=scenario, users=users, peak_rss_mb=_peak_rss_mb())
+    return result
+
+
+def _parse_overrides(pairs) -> dict:
+    out = {}
+    for pair in pairs or []:
+        key, _, value = pair.partition("=")
+        out[key.strip()] = value.strip()
+    return out
+
+
+# ---------------------------------------------------------------------------
+# Driver
+# ---------------------------------------------------------------------------
+def _revision() -> str:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"],
+                             cwd=BOT_DIR, capture_output=True, text=True,
+                             check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "."],
+                               cwd=BOT_DIR, capture_output=True,
+                               text=True).stdout.strip()
+        return rev + ("-dirty" if dirty else "")
+    except Exception:
+        return "unknown"
+
+
+def _spawn(scenario: str, users: int, argv: list, verbose: bool) -> dict:
+    fd, path = tempfile.mkstemp(suffix=".json")
+    os.close(fd)
+    try:
+        cmd = [sys.executable, "-m", "benchmarks.bench_bot", "--worker",
+               scenario, str(users), "--result", path] + argv
+        proc = subprocess.run(cmd, cwd=BOT_DIR,
+                              capture_output=not verbose, text=True)
+        if proc.returncode != 0:
+            tail = (proc.stderr or "").strip().splitlines()[-5:]
+            return {"scenario": scenario, "users": users,
+                    "error": " | ".join(tail) or f"exit {proc.returncode}"}
+        with open(path, "r") as f:
+            return json.load(f)
+    finally:
+        os.unlink(path)
+
+
+def _print_row(r: dict):
+    if "error" in r:
+        print(f"{r['scenario']:<10} {r['users']:>6}  ❌ {r['error']}")
+        return
+    extra = " ".join(f"{k}={v}" for k, v in r["extra"].items())
+    print(f"{r['scenario']:<10} {r['users']:>6} {r['ops']:>7} "
+          f"{r['throughput']:>10.1f} {r['p50_ms']:>9.2f} {r['p99_ms']:>9.2f} "
+          f"{r['peak_rss_mb']:>8.1f}  {extra}")
+
+
+def _compare(results: list, baseline_path: str):
+    with open(baseline_path, "r") as f:
+        baseline = json.load(f)
+    before = {(r["scenario"], r["users"]): r
+              for r in baseline["results"] if "error" not in r}
+    print(f"\nvs {baseline_path} ({baseline.get('revision', '?')}):")
+
+    def delta(new, old):
+        return f"{(new - old) / old * 100:+6.1f}%" if old else "   n/a"
+
+    for r in results:
+        old = before.get((r["scenario"], r["users"]))
+        if old is None or "error" in r:
+            continue
+        print(f"{r['scenario']:<10} {r['users']:>6}  "
+              f"throughput {delta(r['throughput'], old['throughput'])}  "
+              f"p50 {delta(r['p50_ms'], old['p50_ms'])}  "
+              f"p99 {delta(r['p99_ms'], old['p99_ms'])}  "
+              f"rss {delta(r['peak_rss_mb'], old['peak_rss_mb'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Bot cog benchmarks")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS))
+    parser.add_argument("--users", default=DEFAULT_USERS,
+                        help="comma-separated roster sizes")
+    parser.add_argument("--messages", type=int, default=5000,
+                        help="tracking: messages sent")
+    parser.add_argument("--setups", type=int, default=200,
+                        help="setup: users completing setup (capped by roster)")
+    parser.add_argument("--reports", type=int, default=200,
+                        help="getall/cleanup: users with a workbook")
+    parser.add_argument("--departed", type=float, default=0.1,
+                        help="cleanup: share of the roster that left")
+    parser.add_argument("--repeat", type=int, default=50,
+                        help="dashboard calls; getall/cleanup run repeat/10")
+    parser.add_argument("--api-latency", type=float, default=0.0,
+                        help="seconds slept per fake Discord API call")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--set", action="append", metavar="KEY=VALUE",
+                        help="config.json override, e.g. STORAGE_BACKEND=sqlite")
+    parser.add_argument("--json", help="write results here")
+    parser.add_argument("--compare", help="results JSON from another run")
+    parser.add_argument("--verbose", action="store_true",
+                        help="show the bot's own output")
+    parser.add_argument("--worker", nargs=2, metavar=("SCENARIO", "USERS"),
+                        help=argparse.SUPPRESS)
+    parser.add_argument("--result", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.worker:
+        scenario, users = args.worker[0], int(args.worker[1])
+        result = asyncio.run(_run_worker(scenario, users, args))
+        with open(args.result, "w") as f:
+            json.dump(result, f)
+        return
+
+    scenarios = [s for s in args.scenarios.split(",") if s]
+    unknown = set(scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(sorted(unknown))}")
+    sizes = [int(n) for n in args.users.split(",") if n]
+
+    # forwarded to every worker
+    argv = ["--messages", str(args.messages), "--setups", str(args.setups),
+            "--reports", str(args.reports), "--departed", str(args.departed),
+            "--repeat", str(args.repeat), "--api-latency",
+            str(args.api_latency), "--seed", str(args.seed)]
+    for pair in args.set or []:
+        argv += ["--set", pair]
+
+    revision = _revision()
+    print(f"revision {revision}, python {platform.python_version()}, "
+          f"{os.cpu_count()} cpu(s)")
+    print(f"{'scenario':<10} {'users':>6} {'ops':>7} {'ops/s':>10} "
+          f"{'p50 ms':>9} {'p99 ms':>9} {'rss MB':>8}")
+    results = []
+    for scenario in scenarios:
+        for users in sizes:
+            result = _spawn(scenario, users, argv, args.verbose)
+            _print_row(result)
+            results.append(result)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump({
+                "revision": revision,
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "cpus": os.cpu_count(),
+                "args": vars(args),
+                "results": results,
+            }, f, indent=2)
+        print(f"\nSaved {args.json}")
+    if args.compare:
+        _compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+"""
+Microbenchmark for X link extraction (utils/x_links.py).
+
+Compares the extractor with the previous per-message `re.findall` on a raw
+pattern, over a synthetic corpus shaped like a tracking channel: mostly
+chatter, some single-link replies, a few multi-link and share-suffixed
+pastes. Also reports how many tweet ids each version finds.
+
+Usage (from the bot directory):
+    python -m benchmarks.bench_links [--messages 20000] [--repeat 5] [--seed 1]
+"""
+
+import argparse
+import random
+import re
+import timeit
+
+from utils.x_links import extract_tweet_ids
+
+# What tracking_cog.py used before the extractor
+LEGACY_X_LINK_REGEX = r"(https?://(?:www\.)?(?:twitter|x)\.com/[A-Za-z0-9_]+/status/[0-9]+)"
+
+CHATTER = [
+    "gm", "done for today", "on it 🫡", "can't post more, rate limited",
+    "is the target still 30?", "taking a break, back in an hour",
+    "ok", "thanks!", "will catch up tomorrow",
+    "check the pinned doc https://docs.google.com/document/d/abc123/edit",
+    "here's the thread https://discord.com/channels/1/2/3",
+]
+
+HOSTS = [
+    "https://x.com", "https://twitter.com", "https://www.twitter.com",
+    "https://mobile.twitter.com", "https://fxtwitter.com",
+    "https://vxtwitter.com", "http://x.com",
+]
+
+SUFFIXES = ["", "", "", "?s=20", "?s=46&t=AbCdEf123", "/photo/1"]
+
+
+def _link(rng: random.Random) -> str:
+    tweet_id = rng.randrange(10**18, 2 * 10**18)
+    if rng.random() < 0.05:
+        return f"https://twitter.com/i/web/status/{tweet_id}"
+    handle = "".join(rng.choices("abcdefghijklmnopqrstuvwxyz_0123456789",
+                                 k=rng.randint(4, 15)))
+    return f"{rng.choice(HOSTS)}/{handle}/status/{tweet_id}{rng.choice(SUFFIXES)}"
+
+
+def make_corpus(n: int, seed: int = 1) -> list:
+    rng = random.Random(seed)
+    corpus = []
+    for _ in range(n):
+        roll = rng.random()
+        if roll < 0.55:
+            corpus.append(rng.choice(CHATTER))
+        elif roll < 0.85:
+            corpus.append(_link(rng))
+        elif roll < 0.95:
+            corpus.append("\n".join(_link(rng)
+                                    for _ in range(rng.randint(2, 10))))
+        else:
+            link = _link(rng)
+            corpus.append(f"replied here {link} and again {link}")
+    return corpus
+
+
+def legacy(corpus):
+    for text in corpus:
+        re.findall(LEGACY_X_LINK_REGEX, text)
+
+
+def current(corpus):
+    for text in corpus:
+        extract_tweet_ids(text, 50)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="X link extraction benchmark")
+    parser.add_argument("--messages", type=int, default=20000)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages, args.seed)
+    found_legacy = sum(len(re.findall(LEGACY_X_LINK_REGEX, t)) for t in corpus)
+    found_current = sum(len(extract_tweet_ids(t, 50)) for t in corpus)
+    print(f"corpus: {len(corpus)} messages, "
+          f"{sum(1 for t in corpus if '/status/' in t)} with status links")
+
+    for name, fn, found in (("legacy findall", legacy, found_legacy),
+                            ("extract_tweet_ids", current, found_current)):
+        best = min(timeit.repeat(lambda: fn(corpus), number=1,
+                                 repeat=args.repeat))
+        print(f"{name:>18}: {best * 1000:8.2f} ms "
+              f"({best / len(corpus) * 1e6:6.2f} µs/msg), {found} ids")
+
+
+if __name__ == "__main__":
+    main()
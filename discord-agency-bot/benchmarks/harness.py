@@ -0,0 +1,289 @@
+"""
+Fake Discord harness for offline benchmarks.
+
+Builds the real bot from main.py, with its real services and cogs, inside
+a throwaway working directory (its own config.json and data/), and
+replaces the gateway with in-memory stand-ins: `FakeGuild` (members,
+roles, channels, category), `FakeMessage` and `FakeInteraction`. Nothing
+connects to Discord; optional `api_latency` makes channel sends/deletes
+sleep like a round trip would.
+
+    bot = load_bot({"LINK_FLUSH_SECONDS": "0.5"})
+    async with bot:
+        await start_bot(bot)
+        guild = FakeGuild.attach(bot, api_latency=0.0)
+        ...
+        await stop_bot(bot)
+"""
+
+import asyncio
+import itertools
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List, Optional
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+_ids = itertools.count(10**15)
+
+
+def _next_id() -> int:
+    return next(_ids)
+
+
+class FakeRole:
+
+    def __init__(self, role_id: int, name: str = "role"):
+        self.id = role_id
+        self.name = name
+        self.members: List["FakeMember"] = []
+
+    def __eq__(self, other):
+        return isinstance(other, FakeRole) and other.id == self.id
+
+    def __hash__(self):
+        return hash(self.id)
+
+
+class FakeMember:
+
+    def __init__(self, member_id: int, name: str, guild: "FakeGuild",
+                 roles=()):
+        self.id = member_id
+        self.name = name
+        self.display_name = name.title()
+        self.mention = f"<@{member_id}>"
+        self.bot = False
+        self.guild = guild
+        self.roles = list(roles)
+        self.guild_permissions = _Permissions(administrator=True)
+
+    def __str__(self):
+        return self.name
+
+
+class _Permissions:
+
+    def __init__(self, administrator: bool = False):
+        self.administrator = administrator
+
+
+class FakeTextChannel:
+
+    def __init__(self, guild: "FakeGuild", name: str,
+                 channel_id: Optional[int] = None):
+        self.guild = guild
+        self.id = channel_id or _next_id()
+        self.name = name
+        self.mention = f"<#{self.id}>"
+        self.sent = 0
+
+    async def send(self, content=None, **kwargs):
+        await self.guild.api_call()
+        self.sent += 1
+
+    async def delete(self, reason=None):
+        await self.guild.api_call()
+        self.guild.channels.pop(self.id, None)
+
+    def __str__(self):
+        return self.name
+
+
+class FakeCategory:
+
+    def __init__(self, guild: "FakeGuild", category_id: int):
+        self.guild = guild
+        self.id = category_id
+
+    async def create_text_channel(self, name: str, overwrites=None):
+        await self.guild.api_call()
+        return self.guild.add_channel(name)
+
+
+class FakeGuild:
+
+    def __init__(self, guild_id: int, role_id: int, category_id: int,
+                 api_latency: float = 0.0):
+        self.id = guild_id
+        self.api_latency = api_latency
+        self.api_calls = 0
+        self.channels: Dict[int, FakeTextChannel] = {}
+        self.members: Dict[int, FakeMember] = {}
+        self.tracked_role = FakeRole(role_id, "tracked")
+        self.roles = {role_id: self.tracked_role}
+        self.category = FakeCategory(self, category_id)
+        self.default_role = FakeRole(guild_id, "@everyone")
+        self.me = FakeMember(_next_id(), "bot", self)
+
+    @classmethod
+    def attach(cls, bot, api_latency: float = 0.0) -> "FakeGuild":
+        """Create the configured guild and route the bot's lookups to it."""
+        cfg = bot.config
+        guild = cls(cfg.guild_id, cfg.tracked_role_id, cfg.category_id,
+                    api_latency)
+        bot.get_guild = lambda gid: guild if gid == guild.id else None
+        bot.get_channel = guild.get_channel
+        return guild
+
+    async def api_call(self):
+        self.api_calls += 1
+        if self.api_latency:
+            await asyncio.sleep(self.api_latency)
+        else:
+            await asyncio.sleep(0)
+
+    # ---- discord.Guild surface used by the cogs ----
+    def get_channel(self, channel_id):
+        if channel_id == self.category.id:
+            return self.category
+        return self.channels.get(channel_id)
+
+    def get_member(self, member_id):
+        return self.members.get(member_id)
+
+    def get_role(self, role_id):
+        return self.roles.get(role_id)
+
+    @property
+    def text_channels(self):
+        return list(self.channels.values())
+
+    # ---- Building the fixture ----
+    def add_channel(self, name: str,
+                    channel_id: Optional[int] = None) -> FakeTextChannel:
+        ch = FakeTextChannel(self, name, channel_id)
+        self.channels[ch.id] = ch
+        return ch
+
+    def add_member(self, member_id: int, name: str,
+                   tracked: bool = True) -> FakeMember:
+        member = FakeMember(member_id, name, self)
+        if tracked:
+            member.roles.append(self.tracked_role)
+            self.tracked_role.members.append(member)
+        self.members[member_id] = member
+        return member
+
+    def remove_role(self, member: FakeMember):
+        if self.tracked_role in member.roles:
+            member.roles.remove(self.tracked_role)
+            self.tracked_role.members.remove(member)
+
+
+class FakeMessage:
+
+    def __init__(self, author: FakeMember, channel: FakeTextChannel,
+                 content: str):
+        self.id = _next_id()
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild
+        self.content = content
+        self.created_at = datetime.now(timezone.utc)
+        self.sent_at = time.perf_counter()
+        self.reactions: List[tuple] = []  # (emoji, perf_counter)
+
+    async def add_reaction(self, emoji):
+        self.reactions.append((emoji, time.perf_counter()))
+
+
+class _Response:
+
+    def __init__(self):
+        self._done = False
+
+    def is_done(self) -> bool:
+        return self._done
+
+    async def defer(self, **kwargs):
+        self._done = True
+
+    async def send_message(self, content=None, **kwargs):
+        self._done = True
+
+
+class _Followup:
+
+    def __init__(self):
+        self.sent: List[dict] = []
+
+    async def send(self, content=None, **kwargs):
+        self.sent.append(dict(kwargs, content=content))
+
+
+class FakeInteraction:
+
+    def __init__(self, user: FakeMember, guild: FakeGuild):
+        self.user = user
+        self.guild = guild
+        self.response = _Response()
+        self.followup = _Followup()
+
+    async def edit_original_response(self, **kwargs):
+        pass
+
+
+# ---------------------------------------------------------------------------
+# Bot lifecycle
+# ---------------------------------------------------------------------------
+def prepare_workdir(overrides: Optional[dict] = None) -> Path:
+    """Fresh cwd holding the repo's config.json plus `overrides`."""
+    with open(BOT_DIR / "config.json", "r") as f:
+        cfg = json.load(f)
+    cfg.update(overrides or {})
+    workdir = Path(tempfile.mkdtemp(prefix="replyguy-bench-"))
+    with open(workdir / "config.json", "w") as f:
+        json.dump(cfg, f, indent=2)
+    os.chdir(workdir)
+    if str(BOT_DIR) not in sys.path:
+        sys.path.insert(0, str(BOT_DIR))
+    return workdir
+
+
+def load_bot(overrides: Optional[dict] = None):
+    """Import main.py in a fresh working directory and return its bot."""
+    import logging
+
+    prepare_workdir(overrides)
+    import main  # builds bot and services against the cwd
+    logging.getLogger().setLevel(logging.WARNING)
+    logging.getLogger("discord").setLevel(logging.WARNING)
+    return main.bot
+
+
+async def start_bot(bot):
+    """What main() does before connecting, minus the gateway."""
+
+    async def ready():
+        return None
+
+    bot.wait_until_ready = ready
+    await bot.reports.start()
+    for file in sorted(os.listdir(BOT_DIR / "cogs")):
+        if file.endswith(".py"):
+            await bot.load_extension(f"cogs.{file[:-3]}")
+    # periodic work is driven by the scenarios, not by timers
+    cleanup = bot.get_cog("CleanupCog")
+    if cleanup is not None:
+        cleanup.cleanup_loop.cancel()
+
+
+async def stop_bot(bot, keep_workdir: bool = False):
+    for name in list(bot.extensions):
+        await bot.unload_extension(name)
+    await bot.metrics.close()
+    await bot.admin_log.close()
+    bot.reports.close()
+    bot.workbooks.shutdown(wait=True)
+    bot.counters.close()
+    bot.seen_links.close()
+    bot.storage.close()
+    if not keep_workdir:
+        shutil.rmtree(os.getcwd(), ignore_errors=True)
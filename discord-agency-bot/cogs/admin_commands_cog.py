@@ -1,30 +1,53 @@
+import asyncio
+import contextlib
 import discord
 from discord.ext import commands
 from discord import app_commands
 from pathlib import Path
-import openpyxl
 import shutil
 import json
-from datetime import datetime
 
-from utils.storage_utils import Storage
-from utils.excel_utils import get_user_excel_path
+from utils.config import load_config
+from utils.excel_utils import (_sanitize_filename, archive_path,
+                               build_master_report, get_user_excel_path)
+from utils.metrics import METRICS
 
-with open("config.json", "r") as f:
-    CFG = json.load(f)
-
-ADMIN_LOG_CHANNEL = int(CFG.get("ADMIN_CHANNEL_ID"))
-GUILD_ID = int(CFG.get("GUILD_ID"))   # 👈 add this so we can bind commands to one server
+GUILD_ID = load_config().guild_id   # 👈 add this so we can bind commands to one server
 REPORTS_DIR = Path("data/reports")
-ARCHIVE_DIR = Path("data/archive")
-ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+MASTER_PATH = REPORTS_DIR / "master_report.xlsx"
+MASTER_CACHE = REPORTS_DIR / "master_report.json"  # sources it was built from
+PROGRESS_INTERVAL = 2.0  # seconds between /getall progress edits
+
+
+def _report_sources():
+    """Per-user reports plus a (name, mtime, size) signature of them."""
+    sources = sorted(p for p in REPORTS_DIR.glob("*.xlsx")
+                     if p != MASTER_PATH and not p.name.endswith(".tmp.xlsx"))
+    signature = []
+    for p in sources:
+        st = p.stat()
+        signature.append([p.name, st.st_mtime_ns, st.st_size])
+    return sources, signature
+
 
-storage = Storage("data/users.json")
+def _cached_signature():
+    try:
+        with open(MASTER_CACHE, "r") as f:
+            return json.load(f)
+    except Exception:
+        return None
+
+
+def _save_signature(signature):
+    with open(MASTER_CACHE, "w") as f:
+        json.dump(signature, f)
 
 
 class AdminCommandsCog(commands.Cog):
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
+        self._getall_lock = asyncio.Lock()
 
     # -------------------------------
     # 🔹 Delete user command
@@ -36,31 +59,35 @@ class AdminCommandsCog(commands.Cog):
     @app_commands.guilds(discord.Object(id=GUILD_ID))  # 👈 force single-server registration
     @app_commands.checks.has_permissions(administrator=True)
     async def deleteuser(self, interaction: discord.Interaction, member: discord.Member):
-        data = storage.get_user(str(member.id))
-        if not data:
+        user = self.storage.get_user(member.id)
+        if not user:
             return await interaction.response.send_message(
                 "⚠️ User not tracked.", ephemeral=True
             )
 
-        ch_id = data["channel_id"]
-        username = data["username"]
+        ch_id = user.channel_id
+        username = user.username
+        await interaction.response.defer(ephemeral=True)
 
-        # Archive Excel
-        p = get_user_excel_path(username)
-        if p and p.exists():
-            stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-            dest = ARCHIVE_DIR / f"{username}-{stamp}.xlsx"
-            shutil.copy2(p, dest)
+        # Archive Excel (brought up to date with the event log first)
+        await self.bot.reports.refresh(str(member.id))
+        # archive + removal under the user's lock so no queued workbook job
+        # writes to the report in between
+        async with self.bot.locks.user(member.id):
+            p = get_user_excel_path(username)
+            if p and p.exists():
+                dest = archive_path(username)
+                await asyncio.to_thread(shutil.copy2, p, dest)
+
+            # Remove from storage
+            self.storage.remove_user(str(member.id))
 
         # Delete channel
-        ch = interaction.guild.get_channel(int(ch_id))
+        ch = interaction.guild.get_channel(ch_id) if ch_id else None
         if ch:
             await ch.delete(reason="Admin removed user")
 
-        # Remove from storage
-        storage.remove_user(str(member.id))
-
-        await interaction.response.send_message(
+        await interaction.followup.send(
             f"🗑️ Removed {member.mention}, archived Excel.",
             ephemeral=True
         )
@@ -77,25 +104,87 @@ class AdminCommandsCog(commands.Cog):
     async def getall(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
 
-        master = openpyxl.Workbook()
-        master.remove(master.active)
+        # materialize pending link events so every report is current
+        await self.bot.reports.refresh_all()
+
+        async with self._getall_lock:
+            sources, signature = await asyncio.to_thread(_report_sources)
+            if not sources:
+                return await interaction.followup.send(
+                    "⚠️ No reports to compile.", ephemeral=True)
+
+            # reuse the last master report while no source has changed
+            cached = await asyncio.to_thread(_cached_signature)
+            if cached == signature and MASTER_PATH.exists():
+                return await interaction.followup.send(
+                    "📦 No report changed since the last compile.",
+                    file=discord.File(MASTER_PATH),
+                    ephemeral=True)
+
+            with METRICS.timer("getall.compile"):
+                await self._compile_master(interaction, sources)
+            await asyncio.to_thread(_save_signature, signature)
 
-        for file in REPORTS_DIR.glob("*.xlsx"):
-            try:
-                wb = openpyxl.load_workbook(file, read_only=False)
-                ws = wb.active
-                new_ws = master.create_sheet(title=file.stem[:30])
-                for row in ws.iter_rows(values_only=True):
-                    new_ws.append(row)
-            except Exception as e:
-                print(f"⚠️ Skipping {file}: {e}")
-                continue
+        await interaction.followup.send(
+            file=discord.File(MASTER_PATH),
+            ephemeral=True
+        )
+
+    async def _compile_master(self, interaction: discord.Interaction,
+                              sources):
+        loop = asyncio.get_running_loop()
+        done = [0]
+
+        def progress(n, total):
+            loop.call_soon_threadsafe(done.__setitem__, 0, n)
+
+        # each report is read under its owner's lock (from the worker thread)
+        owners = {
+            f"{_sanitize_filename(user.username)}.xlsx": user.key
+            for user in self.storage.list_users()
+        }
+        locks = self.bot.locks
+
+        def guard(path):
+            uid = owners.get(path.name)
+            return locks.user(uid) if uid else contextlib.nullcontext()
+
+        # own thread rather than the workbook pool: it waits on user locks
+        # that queued pool jobs hold, which must not starve them of workers
+        job = asyncio.ensure_future(
+            asyncio.to_thread(build_master_report, sources, MASTER_PATH,
+                              progress, guard))
+        while not job.done():
+            await asyncio.wait([job], timeout=PROGRESS_INTERVAL)
+            if not job.done():
+                try:
+                    await interaction.edit_original_response(
+                        content=f"⏳ Compiling reports… {done[0]}/{len(sources)}")
+                except Exception:
+                    pass
+        job.result()
+        try:
+            await interaction.edit_original_response(
+                content=f"✅ Compiled {len(sources)} report(s).")
+        except Exception:
+            pass
+
+    # -------------------------------
+    # 🔹 Rebuild reply counters
+    # -------------------------------
+    @app_commands.command(
+        name="rebuildcounters",
+        description="Admin: recompute /dashboard reply counters from the event log"
+    )
+    @app_commands.guilds(discord.Object(id=GUILD_ID))  # 👈 force single-server registration
+    @app_commands.checks.has_permissions(administrator=True)
+    async def rebuildcounters(self, interaction: discord.Interaction):
+        await interaction.response.defer(ephemeral=True)
 
-        master_path = REPORTS_DIR / "master_report.xlsx"
-        master.save(master_path)
+        corrected = await self.bot.reports.recount_counters()
 
         await interaction.followup.send(
-            file=discord.File(master_path),
+            f"✅ Rebuilt reply counters ({corrected} user(s) corrected).",
             ephemeral=True
         )
 
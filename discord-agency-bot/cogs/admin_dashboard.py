@@ -5,36 +5,30 @@ Provides an admin-only /dashboard command that shows:
 - Total tracked users
 - Total replies recorded across all users
 - Average replies per user
+- Replies recorded today
 - Top 5 users by replies
+
+Figures come from the running reply counters (bot.counters), so no
+workbook is opened.
+
+/botstats shows the bot's own metrics (utils/metrics.py): hot-path
+timings, counters, gauges and event-loop lag.
 """
 
 import discord
 from discord.ext import commands
 from discord import app_commands
-from datetime import datetime
-import openpyxl
-from pathlib import Path
-import json
-
-from utils.storage_utils import Storage
-from utils.excel_utils import get_user_excel_path
-
-# storage instance (same users.json used across cogs)
-storage = Storage("data/users.json")
+from datetime import datetime, timedelta
+import time
 
-# load config robustly
-with open("config.json", "r") as f:
-    _CFG = json.load(f)
-ADMIN_LOG_CHANNEL = (_CFG.get("ADMIN_CHANNEL_ID")
-                     or _CFG.get("admin_log_channel")
-                     or _CFG.get("admin_log_channel_id"))
-REPORTS_DIR = Path("data/reports")
+from utils.metrics import METRICS
 
 
 class AdminDashboardCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
 
     # -------------------------------------
     # Dashboard Command
@@ -45,44 +39,23 @@ class AdminDashboardCog(commands.Cog):
     @app_commands.checks.has_permissions(administrator=True)
     async def dashboard(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
+        started = time.perf_counter()
 
-        users = storage.list_users() or []  # defensive fallback
+        users = self.storage.list_users() or []  # defensive fallback
 
+        # Running counters: O(users), no workbook is opened
+        counters = self.bot.counters
+        today = datetime.utcnow().date().isoformat()
         total_users = len(users)
         total_replies = 0
+        replies_today = 0
         counts = {}
 
-        for entry in users:
-            try:
-                # unpack tuple safely
-                user_id, channel_id, username, target, start_date, status = entry
-            except Exception:
-                continue
-
-            if not username:
-                counts[username or str(user_id)] = 0
-                continue
-
-            p = get_user_excel_path(username)
-            if not p or not p.exists():
-                counts[username] = 0
-                continue
-
-            try:
-                with openpyxl.load_workbook(p, read_only=True,
-                                            data_only=True) as wb:
-                    ws = wb.active
-                    c = 0
-                    for col in range(2, ws.max_column + 1):
-                        for row in range(2, ws.max_row + 1):
-                            if ws.cell(row=row,
-                                       column=col).value not in (None, ""):
-                                c += 1
-                    counts[username] = c
-                    total_replies += c
-            except Exception as e:
-                counts[username] = 0
-                print(f"⚠️ Error reading {p}: {e}")
+        for user in users:
+            c = counters.total(user.key)
+            counts[user.username] = c
+            total_replies += c
+            replies_today += counters.on_day(user.key, today)
 
         avg_replies = round(total_replies /
                             total_users, 2) if total_users else 0.0
@@ -102,26 +75,81 @@ class AdminDashboardCog(commands.Cog):
         embed.add_field(name="Avg Replies / User",
                         value=str(avg_replies),
                         inline=True)
+        embed.add_field(name="Replies Today",
+                        value=str(replies_today),
+                        inline=True)
         embed.add_field(name="Top 5 Users", value=top_lines, inline=False)
         embed.set_footer(text=f"Generated {datetime.utcnow().isoformat()} UTC")
+        METRICS.observe("dashboard.build", time.perf_counter() - started)
 
         await interaction.followup.send(embed=embed, ephemeral=True)
 
-        # Admin log channel notification
-        await self._log_event(
+        # Admin log channel notification (next digest)
+        self.bot.admin_log.log(
             f"📊 Dashboard viewed by {interaction.user.mention}")
 
+
     # -------------------------------------
-    # Internal helper: log event
+    # Bot Stats Command
     # -------------------------------------
-    async def _log_event(self, message: str):
-        try:
-            if ADMIN_LOG_CHANNEL:
-                ch = self.bot.get_channel(int(ADMIN_LOG_CHANNEL))
-                if ch:
-                    await ch.send(message)
-        except Exception as e:
-            print(f"⚠️ Failed to log dashboard event: {e}")
+    @app_commands.command(
+        name="botstats",
+        description="Admin: show bot performance metrics (timings, loop lag)")
+    @app_commands.checks.has_permissions(administrator=True)
+    async def botstats(self, interaction: discord.Interaction):
+        stats = METRICS.snapshot()
+        if not stats["enabled"]:
+            return await interaction.response.send_message(
+                "📈 Metrics are disabled (set `METRICS_ENABLED` in config.json).",
+                ephemeral=True)
+
+        embed = discord.Embed(title="📈 Bot Stats",
+                              color=discord.Color.blurple())
+        uptime = timedelta(seconds=int(stats["uptime_seconds"]))
+        lag = stats["timers"].get("loop.lag")
+        embed.add_field(name="Uptime", value=str(uptime), inline=True)
+        if lag:
+            embed.add_field(
+                name="Loop Lag (p50 / p99 / max)",
+                value=f"{lag['p50'] * 1000:.1f} / {lag['p99'] * 1000:.1f} / "
+                f"{lag['max'] * 1000:.1f} ms",
+                inline=True)
+
+        # name, count, p50/p99/max in ms
+        rows = [
+            f"{name[:22]:<22} {t['count']:>7} {t['p50'] * 1000:>8.1f} "
+            f"{t['p99'] * 1000:>8.1f} {t['max'] * 1000:>8.1f}"
+            for name, t in sorted(stats["timers"].items()) if name != "loop.lag"
+        ]
+        if rows:
+            header = f"{'timer':<22} {'count':>7} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8}"
+            embed.add_field(name="Timings",
+                            value=_code_block([header] + rows),
+                            inline=False)
+
+        values = [f"{name}: {value}"
+                  for name, value in sorted(stats["counters"].items())]
+        values += [f"{name}: {value}"
+                   for name, value in sorted(stats["gauges"].items())]
+        if values:
+            embed.add_field(name="Counters & Gauges",
+                            value=_code_block(values),
+                            inline=False)
+        embed.set_footer(text=f"Generated {datetime.utcnow().isoformat()} UTC")
+
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+
+
+def _code_block(lines) -> str:
+    """Lines as a code block within an embed field's 1024 characters."""
+    out = []
+    size = 8  # the ``` fences
+    for line in lines:
+        if size + len(line) + 1 > 1024:
+            break
+        out.append(line)
+        size += len(line) + 1
+    return "```\n" + "\n".join(out) + "\n```"
 
 
 async def setup(bot: commands.Bot):
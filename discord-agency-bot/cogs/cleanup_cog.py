@@ -1,124 +1,233 @@
 """
-Cleanup Cog (scheduled)
+Cleanup Cog (event-driven)
 
-Every CLEANUP_HOURS (config) this cog:
-- Reads tracked users from storage
-- For each user, checks whether they still have the configured ROLE in the configured GUILD
-- If user no longer has role or has left: archives their Excel to admin log channel,
+When a tracked member leaves the GUILD (on_member_remove) or loses the
+configured ROLE (on_member_update), shortly after (bursts share one pass)
+this cog:
+- Checks whether they still have the configured ROLE in the configured GUILD
+- If user no longer has role or has left: archives their Excel to the admin digest,
   deletes their private channel if it exists, and removes them from storage
 
-Also exposes an admin-only text command `!cleanup_now` for manual runs.
+Every CLEANUP_HOURS (config; a reload reschedules it) a reconciliation
+pass repeats this for users marked since the last pass: new roster
+entries, and everyone after a (re)connect, when member events may have
+been missed.
+
+Archives and channel deletes run CLEANUP_CONCURRENCY at a time; removals are
+one storage write. Each pass reports its duration per phase.
+
+Also exposes an admin-only text command `!cleanup_now` for a full manual pass.
 """
 
+import asyncio
 import discord
 from discord.ext import commands, tasks
-from pathlib import Path
-import json
+import logging
 import shutil
-from datetime import datetime
+import time
 import traceback
 
-from utils.storage_utils import Storage
-from utils.excel_utils import get_user_excel_path
-
-storage = Storage("data/users.json")
-
-with open("config.json", "r") as f:
-    CFG = json.load(f)
-
-GUILD_ID = int(CFG.get("GUILD_ID") or CFG.get("guild_id"))
-ROLE_ID = int(CFG.get("TRACKED_ROLE_ID") or CFG.get("role_id") or CFG.get("ROLE") or CFG.get("reply_guy_role_id") or CFG.get("ROLE_ID"))
-CATEGORY_ID = int(CFG.get("CATEGORY_ID") or CFG.get("category_id") or CFG.get("CATEGORY"))
-ADMIN_LOG_CHANNEL = int(CFG.get("ADMIN_CHANNEL_ID") or CFG.get("admin_log_channel") or CFG.get("admin_log_channel_id") or CFG.get("ADMIN_LOG_CHANNEL_ID"))
-CLEANUP_HOURS = int(CFG.get("CLEANUP_HOURS") or CFG.get("cleanup_hours") or 6)
-
-ARCHIVE_DIR = Path("data/archive")
-ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+from utils.config import load_config
+from utils.excel_utils import archive_path, get_user_excel_path
+from utils.metrics import METRICS
 
 
 class CleanupCog(commands.Cog):
     def __init__(self, bot):
         self.bot = bot
+        self.storage = bot.storage
+        # settings are read from bot.config when used: reloads apply live
+        # Users to (re)check on the next pass. Member events, roster adds and
+        # (re)connects put ids here; on_ready seeds everyone.
+        self._dirty: set[str] = set()
+        self._drain_timer: asyncio.TimerHandle | None = None
+        self._drain_tasks: set[asyncio.Task] = set()
+        self._sweep_lock = asyncio.Lock()
+        self.storage.subscribe(self._on_storage_change)
         # start the periodic loop
         self.cleanup_loop.start()
 
     def cog_unload(self):
         self.cleanup_loop.cancel()
-
-    async def archive_and_notify(self, guild: discord.Guild, user_id: str, username: str, channel_id: str):
+        self.storage.unsubscribe(self._on_storage_change)
+        if self._drain_timer is not None:
+            self._drain_timer.cancel()
+
+    # ---- Change tracking ----
+    def _on_storage_change(self, user_id: str, before, after):
+        if before is None and after is not None:
+            self._dirty.add(user_id)  # set up since the last pass
+
+    def _mark(self, user_ids):
+        """Queue users for a check; bursts of events share one sweep."""
+        self._dirty.update(user_ids)
+        if self._drain_timer is None:
+            loop = asyncio.get_running_loop()
+            # member events within CLEANUP_DEBOUNCE_SECONDS share one sweep
+            self._drain_timer = loop.call_later(self.bot.config.cleanup_debounce_seconds, self._spawn_drain)
+
+    def _spawn_drain(self):
+        self._drain_timer = None
+        task = asyncio.create_task(self._drain())
+        self._drain_tasks.add(task)
+        task.add_done_callback(self._drain_tasks.discard)
+
+    async def _drain(self):
+        try:
+            await self.sweep(dirty_only=True)
+        except Exception:
+            tb = traceback.format_exc()
+            self.bot.admin_log.log(f"🔥 Cleanup error: {tb}", logging.ERROR)
+
+    @commands.Cog.listener()
+    async def on_member_remove(self, member: discord.Member):
+        if member.guild.id == self.bot.config.guild_id and self.storage.get_user(str(member.id)):
+            self._mark([str(member.id)])
+
+    @commands.Cog.listener()
+    async def on_member_update(self, before: discord.Member, after: discord.Member):
+        cfg = self.bot.config
+        if after.guild.id != cfg.guild_id:
+            return
+        had = any(r.id == cfg.tracked_role_id for r in before.roles)
+        has = any(r.id == cfg.tracked_role_id for r in after.roles)
+        if had and not has and self.storage.get_user(str(after.id)):
+            self._mark([str(after.id)])
+
+    @commands.Cog.listener()
+    async def on_config_reload(self, old, new):
+        if new.cleanup_hours != old.cleanup_hours:
+            self.cleanup_loop.change_interval(hours=new.cleanup_hours)
+
+    @commands.Cog.listener()
+    async def on_ready(self):
+        # fresh session (first login or reconnect): events missed while
+        # disconnected are gone, so recheck everyone once
+        self._mark(u.key for u in self.storage.list_users())
+
+    async def archive_and_notify(self, guild: discord.Guild, user_id: str, username: str, channel_id: int | None):
         """
         Archive user's Excel and notify admin channel.
         Returns True if archived successfully.
         """
         try:
+            await self.bot.reports.refresh(str(user_id))
             p = get_user_excel_path(username) if username else None
             if p and p.exists():
-                stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-                dest = ARCHIVE_DIR / f"{username}-{stamp}.xlsx"
-                shutil.copy2(p, dest)
-                # send to admin log channel
-                ch = guild.get_channel(ADMIN_LOG_CHANNEL)
-                if ch:
-                    await ch.send(f"📤 Archived final report for <@{user_id}> (user lost role / left).", file=discord.File(dest))
+                dest = archive_path(username)
+                # copy on the worker pool, queued behind the user's report writes
+                await self.bot.workbooks.run(str(user_id), shutil.copy2, p, dest)
+                # attached to the next admin digest
+                self.bot.admin_log.log(f"📤 Archived final report for <@{user_id}> (user lost role / left).", file=dest)
                 return True
         except Exception as e:
             # log but continue
-            try:
-                if hasattr(self.bot, "log_event"):
-                    await self.bot.log_event(f"⚠️ Failed to archive Excel for user {user_id}: {e}")
-            except Exception:
-                pass
+            self.bot.admin_log.log(f"⚠️ Failed to archive Excel for user {user_id}: {e}", logging.ERROR)
         return False
 
-    @tasks.loop(hours=CLEANUP_HOURS)
+    async def delete_channel(self, guild: discord.Guild, channel_id: int | None):
+        try:
+            ch_obj = guild.get_channel(channel_id) if channel_id else None
+            if ch_obj:
+                await ch_obj.delete(reason="User lost role or left server - cleanup")
+        except Exception:
+            pass
+
+    async def _bounded(self, sem: asyncio.Semaphore, coro):
+        async with sem:
+            return await coro
+
+    async def sweep(self, dirty_only: bool = False) -> str:
+        """
+        One cleanup pass, phase by phase: find departed users, archive their
+        reports, delete their channels (both with at most CLEANUP_CONCURRENCY
+        in flight), then drop them from storage in a single write.
+        With `dirty_only`, only users marked since the last pass are checked.
+        Returns a one-line summary with per-phase timings.
+        """
+        async with self._sweep_lock:
+            marked, self._dirty = self._dirty, set()
+            try:
+                return await self._sweep(marked, dirty_only)
+            except BaseException:
+                # the pass did not finish: check them again next time
+                self._dirty |= marked
+                raise
+
+    async def _sweep(self, marked: set[str], dirty_only: bool) -> str:
+        cfg = self.bot.config
+        guild = self.bot.get_guild(cfg.guild_id)
+        if not guild:
+            self._dirty |= marked
+            self.bot.admin_log.log("⚠️ Cleanup: configured guild not found", logging.WARNING)
+            return "⚠️ Cleanup: configured guild not found"
+
+        timings = {}
+        started = phase = time.perf_counter()
+
+        def lap(name):
+            nonlocal phase
+            now = time.perf_counter()
+            timings[name] = now - phase
+            METRICS.observe(f"cleanup.{name}", now - phase)
+            phase = now
+
+        # Scan: who lost the role or left
+        role = guild.get_role(cfg.tracked_role_id)
+        if dirty_only:
+            users = filter(None, map(self.storage.get_user, marked))
+        else:
+            users = self.storage.list_users()
+        departed = []
+        checked = 0
+        for user in users:
+            checked += 1
+            member = guild.get_member(user.user_id)
+            has_role = bool(member and role and role in member.roles)
+            if not member or not has_role:
+                departed.append(user)
+        lap("scan")
+
+        if departed:
+            sem = asyncio.Semaphore(cfg.cleanup_concurrency)
+
+            # Archive Excel & notify admin
+            await asyncio.gather(*(
+                self._bounded(sem, self.archive_and_notify(guild, user.key, user.username, user.channel_id))
+                for user in departed))
+            lap("archive")
+
+            # Delete channels
+            await asyncio.gather(*(
+                self._bounded(sem, self.delete_channel(guild, user.channel_id))
+                for user in departed))
+            lap("channels")
+
+            # remove entries from storage (one backend write)
+            self.storage.remove_users(user.key for user in departed)
+            lap("storage")
+
+        total = time.perf_counter() - started
+        METRICS.observe("cleanup.sweep", total)
+        METRICS.inc("cleanup.removed", len(departed))
+        phases = ", ".join(f"{name} {secs:.2f}s" for name, secs in timings.items())
+        summary = f"🧹 Cleanup checked {checked} and removed {len(departed)} user(s) in {total:.2f}s ({phases})."
+        print(summary)
+        if departed:
+            self.bot.admin_log.log(summary)
+        return summary
+
+    @tasks.loop(hours=load_config().cleanup_hours)
     async def cleanup_loop(self):
-        # wait until ready
+        # Reconciliation: departures are handled as their events arrive;
+        # this pass only rechecks users marked since the last one
         await self.bot.wait_until_ready()
         try:
-            guild = self.bot.get_guild(GUILD_ID)
-            if not guild:
-                if hasattr(self.bot, "log_event"):
-                    await self.bot.log_event("⚠️ Cleanup: configured guild not found")
-                return
-
-            role = guild.get_role(ROLE_ID)
-            users = storage.list_users()
-            to_remove = []
-
-            for (user_id, ch_id, username, replies_per_day, start_date, status) in users:
-                member = guild.get_member(int(user_id))
-                has_role = False
-                if member and role:
-                    has_role = role in member.roles
-
-                if not member or not has_role:
-                    # Archive Excel & notify admin
-                    await self.archive_and_notify(guild, user_id, username, ch_id)
-
-                    # Delete channel if exists
-                    try:
-                        ch_obj = guild.get_channel(int(ch_id))
-                        if ch_obj:
-                            await ch_obj.delete(reason="User lost role or left server - cleanup")
-                    except Exception:
-                        pass
-
-                    to_remove.append(user_id)
-
-            # remove entries from storage
-            if to_remove:
-                for uid in to_remove:
-                    storage.remove_user(uid)
-                if hasattr(self.bot, "log_event"):
-                    await self.bot.log_event(f"🧹 Cleanup removed {len(to_remove)} user(s).")
+            await self.sweep(dirty_only=True)
         except Exception as ex:
             # global error logging
             tb = traceback.format_exc()
-            try:
-                if hasattr(self.bot, "log_event"):
-                    await self.bot.log_event(f"🔥 Cleanup error: {tb}")
-            except Exception:
-                pass
+            self.bot.admin_log.log(f"🔥 Cleanup error: {tb}", logging.ERROR)
 
     @cleanup_loop.before_loop
     async def before_cleanup(self):
@@ -130,8 +239,8 @@ class CleanupCog(commands.Cog):
     async def cleanup_now(self, ctx):
         """Run cleanup immediately (admin-only)."""
         await ctx.send("🧹 Running cleanup now...")
-        await self.cleanup_loop.coro()
-        await ctx.send("✅ Cleanup complete.")
+        summary = await self.sweep()
+        await ctx.send(f"✅ Cleanup complete. {summary}")
 
 
 async def setup(bot):
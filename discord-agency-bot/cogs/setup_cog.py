@@ -1,28 +1,27 @@
+import asyncio
 import discord
 from discord import app_commands
 from discord.ext import commands
-import json
 from datetime import datetime, timedelta
-from pathlib import Path
 
-from utils.storage_utils import Storage
-from utils import excel_utils
-
-storage = Storage("data/users.json")
+from utils.config import load_config
+from utils.dispatch import MessageContext
+from utils.models import UserStatus
 
 
 class SetupCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        with open("config.json", "r") as f:
-            self.config = json.load(f)
-
-        self.guild_id = int(self.config["GUILD_ID"])
-        self.role_id = int(self.config["TRACKED_ROLE_ID"])
-        self.category_id = int(self.config["CATEGORY_ID"])
-        self.admin_channel_id = int(self.config["ADMIN_CHANNEL_ID"])
-        self.admin_role_id = int(self.config["ADMIN_ROLE_ID"])
+        self.storage = bot.storage
+        # ids need a restart to change; SETUP_CONCURRENCY is read per run
+        config = bot.config
+        self.guild_id = config.guild_id
+        self.role_id = config.tracked_role_id
+        self.category_id = config.category_id
+        self.admin_channel_id = config.admin_channel_id
+        self.admin_role_id = config.admin_role_id
+        self._onboarding = asyncio.Lock()
 
     async def create_user_channel(self, member: discord.Member):
         category = member.guild.get_channel(self.category_id)
@@ -47,6 +46,19 @@ class SetupCog(commands.Cog):
 
     @commands.Cog.listener()
     async def on_ready(self):
+        # on_ready fires again on every reconnect; runs never overlap and a
+        # rerun skips everyone already set up
+        if self._onboarding.locked():
+            return
+        async with self._onboarding:
+            await self.onboard_role_members()
+
+    async def onboard_role_members(self):
+        """
+        Give every role member without a working setup a channel and a
+        pending roster entry: channels are looked up in one name index,
+        created SETUP_CONCURRENCY at a time, and stored in one write.
+        """
         guild = self.bot.get_guild(self.guild_id)
         if not guild:
             return
@@ -55,50 +67,75 @@ class SetupCog(commands.Cog):
         if not role:
             return
 
+        channels_by_name = {ch.name: ch for ch in guild.text_channels}
+        adopt, create = [], []
         for member in role.members:
-            user_data = storage.get_user(str(member.id))
-            existing_channel = discord.utils.get(guild.text_channels,
-                                                 name=f"{member.name}-replies")
-
-            if user_data and existing_channel and str(
-                    user_data.get("channel_id")) == str(existing_channel.id):
+            user = self.storage.get_user(member.id)
+            if user and user.channel_id and guild.get_channel(
+                    user.channel_id):
                 continue  # Already set up
 
+            existing_channel = channels_by_name.get(f"{member.name}-replies")
             if existing_channel:
-                storage.add_user(str(member.id),
-                                 str(existing_channel.id),
-                                 member.display_name,
-                                 0,
-                                 status="pending")
-                await existing_channel.send(
+                adopt.append((member, existing_channel))
+            else:
+                create.append(member)
+
+        sem = asyncio.Semaphore(self.bot.config.setup_concurrency)
+
+        async def create_one(member):
+            async with sem:
+                try:
+                    return member, await self.create_user_channel(member)
+                except Exception as e:
+                    print(f"⚠️ Failed to create channel for {member}: {e}")
+                    return member, None
+
+        created = await asyncio.gather(*(create_one(m) for m in create))
+        created = [(m, ch) for m, ch in created if ch is not None]
+
+        self.storage.add_users({
+            str(member.id): dict(channel_id=channel.id,
+                                 username=member.display_name,
+                                 replies_per_day=0,
+                                 status=UserStatus.PENDING)
+            for member, channel in adopt + created
+        })
+
+        async def greet(channel, text):
+            async with sem:
+                try:
+                    await channel.send(text)
+                except Exception as e:
+                    print(f"⚠️ Failed to greet in #{channel}: {e}")
+
+        await asyncio.gather(
+            *(greet(channel,
                     f"👋 Hi {member.mention}, we detected you already had this channel.\n"
                     f"Please provide: `username, targetReplies, YYYY-MM-DD`\n"
                     f"Example: `elonmusk, 5, 2025-06-08`\n"
                     f"drop your links immediately")
-                continue
-
-            channel = await self.create_user_channel(member)
-            storage.add_user(str(member.id),
-                             str(channel.id),
-                             member.display_name,
-                             0,
-                             status="pending")
-            await channel.send(
-                f"👋 Hi {member.mention}, we set you up automatically.\n"
-                f"Please provide: `username, targetReplies, YYYY-MM-DD`\n"
-                f"Example: `elonmusk, 5, 2025-06-08`\n"
-                f"drop your links immediately")
+              for member, channel in adopt),
+            *(greet(channel,
+                    f"👋 Hi {member.mention}, we set you up automatically.\n"
+                    f"Please provide: `username, targetReplies, YYYY-MM-DD`\n"
+                    f"Example: `elonmusk, 5, 2025-06-08`\n"
+                    f"drop your links immediately")
+              for member, channel in created))
+        if adopt or created:
+            print(f"✅ Onboarded {len(adopt) + len(created)} role member(s) "
+                  f"({len(created)} new channel(s)).")
 
     @commands.Cog.listener()
     async def on_member_update(self, before, after):
         role = after.guild.get_role(self.role_id)
         if role not in before.roles and role in after.roles:
             channel = await self.create_user_channel(after)
-            storage.add_user(str(after.id),
-                             str(channel.id),
-                             after.display_name,
-                             0,
-                             status="pending")
+            self.storage.add_user(str(after.id),
+                                  channel.id,
+                                  after.display_name,
+                                  0,
+                                  status=UserStatus.PENDING)
             await channel.send(
                 f"👋 Hi {after.mention}, welcome!\n"
                 f"Please set up your tracking with the following format:\n"
@@ -106,20 +143,17 @@ class SetupCog(commands.Cog):
                 f"Example: `elonmusk, 5, 2025-06-08`\n"
                 f"drop your links immediately")
 
-    @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-
-        known_channels = [ch for _, ch, *_ in storage.list_users()]
-        if str(message.channel.id) not in [str(c) for c in known_channels]:
-            return
+    async def cog_load(self):
+        # Messages from users not (or no longer) active (bot.dispatcher)
+        self.bot.dispatcher.register(
+            (UserStatus.PENDING, UserStatus.PAUSED), self.handle_message)
 
-        user_id = str(message.author.id)
-        user_data = storage.get_user(user_id)
+    async def cog_unload(self):
+        self.bot.dispatcher.unregister(self.handle_message)
 
-        if user_data and user_data.get("status") == "active":
-            return  # Already set up
+    async def handle_message(self, message: discord.Message,
+                             ctx: MessageContext):
+        user_id = ctx.user_id
 
         try:
             parts = [p.strip() for p in message.content.split(",")]
@@ -127,15 +161,14 @@ class SetupCog(commands.Cog):
             start_date = datetime.strptime(start_date, "%Y-%m-%d").date()
             end_date = start_date + timedelta(days=60)
 
-            storage.set_user(discord_id=user_id,
-                             channel_id=str(message.channel.id),
-                             username=username,
-                             replies_per_day=int(target),
-                             status="active",
-                             start_date=start_date.isoformat())
+            self.storage.set_user(discord_id=user_id,
+                                  channel_id=message.channel.id,
+                                  username=username,
+                                  replies_per_day=int(target),
+                                  status=UserStatus.ACTIVE,
+                                  start_date=start_date)
 
-            excel_utils.create_user_excel(user_id, username, start_date,
-                                          end_date, int(target))
+            await self.bot.reports.rebuild(user_id)
             await message.channel.send(
                 f"✅ Setup complete for **{username}**.\n"
                 f"Tracking from **{start_date} → {end_date}** with **{target} replies/day**."
@@ -149,7 +182,7 @@ class SetupCog(commands.Cog):
     @app_commands.command(
         name="setupuser",
         description="Admin: manually set up a user if the bot missed them")
-    @app_commands.guilds(discord.Object(id=1418568586741551187))
+    @app_commands.guilds(discord.Object(id=load_config().guild_id))
     @app_commands.checks.has_permissions(administrator=True)
     async def setupuser(self,
                         interaction: discord.Interaction,
@@ -168,17 +201,15 @@ class SetupCog(commands.Cog):
             ch = await self.create_user_channel(member)
 
         start_date = datetime.utcnow().date()
-        end_date = start_date + timedelta(days=60)
 
-        storage.add_user(str(member.id),
-                         str(ch.id),
-                         member.display_name,
-                         int(target),
-                         status="active",
-                         start_date=start_date.isoformat())
+        self.storage.add_user(str(member.id),
+                              ch.id,
+                              member.display_name,
+                              int(target),
+                              status=UserStatus.ACTIVE,
+                              start_date=start_date)
 
-        excel_utils.create_user_excel(str(member.id), member.display_name,
-                                      start_date, end_date, int(target))
+        await self.bot.reports.rebuild(str(member.id))
 
         await ch.send(
             f"👋 Hi {member.mention}, you’ve been manually set up by an admin.\n"
@@ -1,85 +1,119 @@
+import asyncio
+import logging
 import discord
 from discord.ext import commands
-import re
-from datetime import datetime, timedelta
-import json
-from pathlib import Path
+from datetime import datetime
 
-from utils.storage_utils import Storage
-from utils import excel_utils
-from utils.excel_utils import _sanitize_filename  # ✅ use for consistent file names
+from utils.dispatch import MessageContext
+from utils.event_store import LinkEvent
+from utils.link_ingest import LinkIngest
+from utils.metrics import METRICS
+from utils.models import TrackedUser, UserStatus
+from utils.x_links import extract_tweet_ids
 
-X_LINK_REGEX = r"(https?://(?:www\.)?(?:twitter|x)\.com/[A-Za-z0-9_]+/status/[0-9]+)"
-
-storage = Storage("data/users.json")
+MAX_LINKS_PER_MESSAGE = 50  # safety cap
+DUPLICATE_REACTION = "🔁"
 
 
 class TrackingCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
-        with open("config.json", "r") as f:
-            self.config = json.load(f)
-
-        self.admin_channel_id = int(self.config.get("ADMIN_CHANNEL_ID", 0))
-        self.guild_id = int(self.config.get("GUILD_ID"))
+        self.storage = bot.storage
+        self.guild_id = bot.config.guild_id
+        self._pending: set[asyncio.Task] = set()
+
+        # Links arriving close together share one append; the user's
+        # workbook is materialized from the events later (bot.reports)
+        self.ingest = LinkIngest(
+            bot.workbooks,
+            self._write_events,
+            flush_seconds=bot.config.link_flush_seconds,
+            batch_size=bot.config.link_batch_size,
+            on_written=self._on_written)
+
+    async def cog_load(self):
+        # Messages from active users in their own channel (bot.dispatcher)
+        self.bot.dispatcher.register((UserStatus.ACTIVE, ),
+                                     self.handle_message)
+        # warm the seen-link sets off the loop before the first message
+        await asyncio.to_thread(self.bot.seen_links.load)
+
+    async def cog_unload(self):
+        self.bot.dispatcher.unregister(self.handle_message)
+        await self.ingest.close()
 
     @commands.Cog.listener()
-    async def on_message(self, message: discord.Message):
-        if message.author.bot:
-            return
-
-        user_id = str(message.author.id)
-        user_data = storage.get_user(user_id)
-
-        # Only track if user is registered + active
-        if not user_data or user_data.get("status") != "active":
+    async def on_config_reload(self, old, new):
+        # batches already buffered keep their timers; new ones use these
+        self.ingest.flush_seconds = new.link_flush_seconds
+        self.ingest.batch_size = new.link_batch_size
+
+    async def handle_message(self, message: discord.Message,
+                             ctx: MessageContext):
+        user_id, user = ctx.user_id, ctx.user
+
+        # Track links (canonical tweet ids, repeats within the message dropped)
+        tweet_ids = extract_tweet_ids(message.content, MAX_LINKS_PER_MESSAGE)
+        if not tweet_ids:
             return
 
-        if str(message.channel.id) != str(user_data.get("channel_id")):
-            return  # Ignore messages in unrelated channels
-
-        # Track links
-        links = re.findall(X_LINK_REGEX, message.content)
-        if not links:
+        # Reposts of already recorded tweets are flagged, not counted again
+        tweet_ids, duplicates = self.bot.seen_links.claim(user_id, tweet_ids)
+        if duplicates:
+            METRICS.inc("links.duplicates", len(duplicates))
+            try:
+                await message.add_reaction(DUPLICATE_REACTION)
+            except Exception:
+                pass
+        if not tweet_ids:
             return
 
-        links = links[:50]  # safety cap
         today = datetime.utcnow().date()
-        admin_channel = self.bot.get_channel(
-            self.admin_channel_id) if self.admin_channel_id else None
-
+        ts = int(message.created_at.timestamp())
+        events = [
+            LinkEvent(user_id, today.isoformat(), tweet_id, str(message.id),
+                      ts) for tweet_id in tweet_ids
+        ]
+
+        # Events are batched and appended off the loop; react once durable.
+        task = asyncio.create_task(
+            self._record(message, user_id, user, events))
+        self._pending.add(task)
+        task.add_done_callback(self._pending.discard)
+
+    def _on_written(self, user_id: str, events: list) -> None:
+        METRICS.inc("links.recorded", len(events))
+        self.bot.reports.add(user_id, events)
+
+    def _write_events(self, user_id: str, user: TrackedUser,
+                      events: list) -> None:
+        """Blocking part of recording: runs on the executor."""
+        with METRICS.timer("links.append"):
+            self.bot.events.append(events)
+
+    async def _record(self, message: discord.Message, user_id: str,
+                      user: TrackedUser, events: list) -> None:
         try:
-            username = user_data.get("username") or f"user_{user_id}"
-            safe_username = _sanitize_filename(username)  # ✅ always sanitize
-            excel_path = Path(f"data/reports/{safe_username}.xlsx")
-
-            # Auto-create excel if missing
-            if not excel_path.exists():
-                start_date = datetime.utcnow().date()
-                end_date = start_date + timedelta(days=60)
-                excel_utils.create_user_excel(
-                    user_id, safe_username, start_date, end_date,
-                    int(user_data.get("replies_per_day", 5)))
-
-            excel_utils.record_links(safe_username, today,
-                                     links)  # ✅ use safe_username
+            # message -> durable, including the batching delay
+            with METRICS.timer("links.record"):
+                await self.ingest.submit(user_id, user, events)
             await message.add_reaction("✅")
-
-            if admin_channel:
-                await admin_channel.send(
-                    f"📝 {message.author.mention} logged **{len(links)}** link(s) on {today}."
-                )
+            # summarized in the next admin digest
+            self.bot.admin_log.links(user_id, len(events))
 
         except Exception as e:
+            # not recorded: the links may be posted again
+            METRICS.inc("links.failed", len(events))
+            self.bot.seen_links.release(user_id,
+                                        [ev.tweet_id for ev in events])
             try:
                 await message.add_reaction("⚠️")
             except Exception:
                 pass
-            if admin_channel:
-                await admin_channel.send(
-                    f"⚠️ Error recording links for {message.author.mention}: {e}"
-                )
+            self.bot.admin_log.log(
+                f"⚠️ Error recording links for {message.author.mention}: {e}",
+                logging.ERROR)
             print(f"⚠️ TrackingCog error: {e}")
 
 
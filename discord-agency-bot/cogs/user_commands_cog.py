@@ -1,56 +1,31 @@
+import asyncio
 import discord
 from discord.ext import commands
 from discord import app_commands
-from pathlib import Path
 import shutil
-import traceback
-import json
-from datetime import datetime
+import logging
 
-from utils.storage_utils import Storage
-from utils.excel_utils import get_user_excel_path
+from typing import Optional
 
-# --- Persistent storage ---
-storage = Storage("data/users.json")
+from utils.config import load_config
+from utils.excel_utils import archive_path, get_user_excel_path
+from utils.models import TrackedUser
 
 # --- Load config ---
-with open("config.json", "r") as f:
-    CONFIG = json.load(f)
-
-GUILD_ID = int(CONFIG.get("GUILD_ID"))
-ADMIN_LOG_CHANNEL_ID = int(
-    CONFIG.get("ADMIN_CHANNEL_ID") or CONFIG.get("admin_log_channel_id") or 0)
-
-# --- Paths ---
-REPORTS_DIR = Path("data/reports")
-ARCHIVE_DIR = Path("data/archive")
-ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+GUILD_ID = load_config().guild_id
 
 
 class UserCommandsCog(commands.Cog):
 
     def __init__(self, bot: commands.Bot):
         self.bot = bot
+        self.storage = bot.storage
         self.guild = discord.Object(id=GUILD_ID)
 
     # ---------- Utility helpers ----------
-    def _user_row(self, discord_id: str):
-        """
-        Return tuple (user_id, channel_id, username, replies_per_day, start_date, status)
-        or None if not present.
-        """
-        return storage.get_user_by_discord_id(str(discord_id))
-
-    async def _send_admin_log(self, message: str, file_path: Path = None):
-        try:
-            ch = self.bot.get_channel(ADMIN_LOG_CHANNEL_ID)
-            if ch:
-                await ch.send(message)
-                if file_path and file_path.exists():
-                    await ch.send(file=discord.File(file_path))
-        except Exception:
-            print("⚠️ Failed to send admin log:")
-            traceback.print_exc()
+    def _user(self, discord_id) -> Optional[TrackedUser]:
+        """The user's roster record, or None if not present."""
+        return self.storage.get_user(discord_id)
 
     # ---------- /myreport ----------
     @app_commands.command(
@@ -59,78 +34,66 @@ class UserCommandsCog(commands.Cog):
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     async def myreport(self, interaction: discord.Interaction):
         await interaction.response.defer(ephemeral=True)
-        row = self._user_row(str(interaction.user.id))
-        if not row:
+        user = self._user(interaction.user.id)
+        if not user:
             return await interaction.followup.send(
                 "⚠️ You are not set up for tracking.", ephemeral=True)
+        username = user.username
 
-        # Unpack safely (should be 6 items)
-        try:
-            _, _, username, _, _, _ = row
-        except Exception:
-            return await interaction.followup.send(
-                "⚠️ Internal error: user data malformed.", ephemeral=True)
-
-        path = get_user_excel_path(username) if username else None
+        # bring the workbook up to date with links not yet materialized
+        path = await self.bot.reports.refresh(str(interaction.user.id))
+        if not path:
+            path = get_user_excel_path(username)
         if not path or not path.exists():
             return await interaction.followup.send(
                 "⚠️ Your Excel file was not found.", ephemeral=True)
 
         try:
-            await interaction.followup.send(file=discord.File(str(path)),
-                                            ephemeral=True)
-            await self._send_admin_log(
+            # no workbook job may rewrite the file while it uploads
+            async with self.bot.locks.user(interaction.user.id):
+                await interaction.followup.send(file=discord.File(str(path)),
+                                                ephemeral=True)
+            self.bot.admin_log.log(
                 f"📥 {interaction.user.mention} requested their report ({username})."
             )
         except Exception as e:
             await interaction.followup.send(f"⚠️ Failed to send file: {e}",
                                             ephemeral=True)
-            await self._send_admin_log(
-                f"⚠️ Failed to send Excel to {interaction.user.mention}: {e}")
+            self.bot.admin_log.log(
+                f"⚠️ Failed to send Excel to {interaction.user.mention}: {e}",
+                logging.WARNING)
 
     # ---------- /pause ----------
     @app_commands.command(name="pause",
                           description="Pause your tracking (vacation mode)")
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     async def pause(self, interaction: discord.Interaction):
-        row = self._user_row(str(interaction.user.id))
-        if not row:
+        user = self._user(interaction.user.id)
+        if not user:
             return await interaction.response.send_message(
                 "⚠️ You are not set up for tracking.", ephemeral=True)
 
-        user_id, channel_id, username, replies_per_day, start_date, _ = row
-        storage.set_user(discord_id=str(user_id),
-                         channel_id=str(channel_id),
-                         username=username,
-                         replies_per_day=replies_per_day,
-                         start_date=start_date,
-                         status="paused")
+        self.storage.pause_user(user.key)
         await interaction.response.send_message(
             "⏸️ Your tracking has been paused. Use `/resume` to continue.",
             ephemeral=True)
-        await self._send_admin_log(
-            f"⏸️ {interaction.user.mention} paused tracking for `{username}`.")
+        self.bot.admin_log.log(
+            f"⏸️ {interaction.user.mention} paused tracking for `{user.username}`.")
 
     # ---------- /resume ----------
     @app_commands.command(name="resume", description="Resume your tracking")
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     async def resume(self, interaction: discord.Interaction):
-        row = self._user_row(str(interaction.user.id))
-        if not row:
+        user = self._user(interaction.user.id)
+        if not user:
             return await interaction.response.send_message(
                 "⚠️ You are not set up for tracking.", ephemeral=True)
 
-        user_id, channel_id, username, replies_per_day, start_date, _ = row
-        storage.set_user(discord_id=str(user_id),
-                         channel_id=str(channel_id),
-                         username=username,
-                         replies_per_day=replies_per_day,
-                         start_date=start_date,
-                         status="active")
+        self.storage.resume_user(user.key)
         await interaction.response.send_message(
             "▶️ Your tracking has been resumed.", ephemeral=True)
-        await self._send_admin_log(
-            f"▶️ {interaction.user.mention} resumed tracking for `{username}`."
+        self.bot.admin_log.log(
+            f"▶️ {interaction.user.mention} resumed tracking for `{user.username}`."
         )
 
     # ---------- /settarget ----------
@@ -144,19 +107,18 @@ class UserCommandsCog(commands.Cog):
             return await interaction.response.send_message(
                 "Replies per day must be a positive integer.", ephemeral=True)
 
-        row = self._user_row(str(interaction.user.id))
-        if not row:
+        user = self._user(interaction.user.id)
+        if not user:
             return await interaction.response.send_message(
                 "⚠️ You are not set up for tracking.", ephemeral=True)
 
-        user_id, _, username, old_replies, _, _ = row
-        storage.update_replies_per_day(str(user_id), int(replies_per_day))
+        self.storage.update_replies_per_day(user.key, int(replies_per_day))
 
         await interaction.response.send_message(
             f"✅ Your target is now set to **{replies_per_day}** replies/day.",
             ephemeral=True)
-        await self._send_admin_log(
-            f"🔁 {interaction.user.mention} changed target for `{username}`: {old_replies} -> {replies_per_day}"
+        self.bot.admin_log.log(
+            f"🔁 {interaction.user.mention} changed target for `{user.username}`: {user.replies_per_day} -> {replies_per_day}"
         )
 
     # ---------- /stop ----------
@@ -166,36 +128,46 @@ class UserCommandsCog(commands.Cog):
         "Stop tracking permanently (archive your Excel & remove mapping)")
     @app_commands.guilds(discord.Object(id=GUILD_ID))
     async def stop(self, interaction: discord.Interaction):
-        row = self._user_row(str(interaction.user.id))
-        if not row:
+        user = self._user(interaction.user.id)
+        if not user:
             return await interaction.response.send_message(
                 "⚠️ You are not set up for tracking.", ephemeral=True)
 
-        user_id, _, username, _, _, _ = row
+        user_id, username = user.key, user.username
+        await interaction.response.defer(ephemeral=True)
 
         archived_path = None
         try:
-            path = get_user_excel_path(username) if username else None
-            if path and path.exists():
-                stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
-                dest = ARCHIVE_DIR / f"{username}-{stamp}.xlsx"
-                shutil.move(str(path), str(dest))
-                archived_path = dest
+            # archive the final report including links not yet materialized
+            await self.bot.reports.refresh(user_id)
         except Exception as e:
-            await self._send_admin_log(
-                f"⚠️ Failed to archive Excel for {interaction.user.mention} ({username}): {e}"
-            )
-
-        storage.remove_user(str(user_id))
-
-        await interaction.response.send_message(
+            self.bot.admin_log.log(
+                f"⚠️ Failed to refresh Excel for {interaction.user.mention} ({username}): {e}",
+                logging.ERROR)
+        # archive + removal under the user's lock: a link batch or lazy
+        # refresh queued meanwhile cannot write to the report in between
+        async with self.bot.locks.user(user_id):
+            try:
+                path = get_user_excel_path(username)
+                if path and path.exists():
+                    dest = archive_path(username)
+                    await asyncio.to_thread(shutil.move, str(path), str(dest))
+                    archived_path = dest
+            except Exception as e:
+                self.bot.admin_log.log(
+                    f"⚠️ Failed to archive Excel for {interaction.user.mention} ({username}): {e}",
+                    logging.ERROR)
+
+            self.storage.remove_user(user_id)
+
+        await interaction.followup.send(
             "🛑 You have been removed from tracking. Your final report has been archived.",
             ephemeral=True)
 
         msg = f"🛑 {interaction.user.mention} stopped tracking for `{username}`."
         if archived_path:
             msg += " Final report attached."
-        await self._send_admin_log(msg, file_path=archived_path)
+        self.bot.admin_log.log(msg, file=archived_path)
 
     # ---------- /whoami_tracking ----------
     @app_commands.command(
@@ -211,16 +183,15 @@ class UserCommandsCog(commands.Cog):
                                                            ephemeral=True)
 
         if target:
-            row = storage.get_user_by_discord_id(str(target.id))
-            if not row:
+            user = self._user(target.id)
+            if not user:
                 return await interaction.response.send_message(
                     f"No mapping for {target.mention}", ephemeral=True)
-            user_id, ch_id, username, replies_per_day, start_date, status = row
             return await interaction.response.send_message(
-                f"User {target.mention}: username={username}, channel_id={ch_id}, replies/day={replies_per_day}, start_date={start_date}, status={status}",
+                f"User {target.mention}: username={user.username}, channel_id={user.channel_id}, replies/day={user.replies_per_day}, start_date={user.start_date}, status={user.status}",
                 ephemeral=True)
         else:
-            users = storage.list_users()
+            users = self.storage.list_users()
             return await interaction.response.send_message(
                 f"Total tracked users: {len(users)} (use target to query one).",
                 ephemeral=True)
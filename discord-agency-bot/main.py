@@ -1,13 +1,29 @@
+import time
+
+_T0 = time.perf_counter()  # startup timeline origin
+
 import os
-import json
 import asyncio
 import logging
-from pathlib import Path
 
 import discord
 from discord.ext import commands
 from discord import app_commands
 
+from utils.admin_log import AdminLog
+from utils.config import CONFIG_PATH, ConfigError, ConfigWatcher, load_config
+from utils.dispatch import MessageDispatcher
+from utils.event_store import LinkEventStore
+from utils.locks import LockManager
+from utils.loop_watchdog import LoopWatchdog
+from utils.metrics import METRICS
+from utils.reply_counters import ReplyCounters
+from utils.routing import ChannelRouter
+from utils.seen_links import SeenLinks
+from utils.report_views import ReportViews
+from utils.storage_utils import DEFAULT_PATH, get_storage_instance
+from utils.workbook_executor import WorkbookExecutor
+
 # -------------------------
 # Logging
 # -------------------------
@@ -15,26 +31,42 @@ logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("replyguy")
 
 # -------------------------
-# Load config.json
+# Startup timeline
+# -------------------------
+_timeline = []  # (phase, seconds) in the order phases finished
+
+
+def _phase(name: str, since: float) -> float:
+    """Log and record a startup phase that began at `since`; returns now."""
+    now = time.perf_counter()
+    _timeline.append((name, now - since))
+    METRICS.observe(f"startup.{name}", now - since)
+    log.info("⏱️ startup %-8s %7.1f ms (t+%.2fs)", name, (now - since) * 1000,
+             now - _T0)
+    return now
+
+
+_t = _phase("imports", _T0)
+
+# -------------------------
+# Load config.json (validated once; shared as bot.config)
 # -------------------------
-CFG_PATH = Path("config.json")
-if not CFG_PATH.exists():
+if not CONFIG_PATH.exists():
     log.error("config.json not found!")
     raise SystemExit(1)
 
-with open(CFG_PATH, "r") as f:
-    CFG = json.load(f)
-
 try:
-    GUILD_ID = int(CFG["GUILD_ID"])
-    ROLE_ID = int(CFG["TRACKED_ROLE_ID"])
-    CATEGORY_ID = int(CFG["CATEGORY_ID"])
-    ADMIN_LOG_CHANNEL = int(CFG["ADMIN_CHANNEL_ID"])
-    APPLICATION_ID = int(CFG["APPLICATION_ID"])
-except KeyError as e:
-    log.error("Missing config key: %s", e)
+    CFG = load_config()
+except ConfigError as e:
+    log.error("Invalid config.json: %s", e)
     raise SystemExit(1)
 
+GUILD_ID = CFG.guild_id
+
+# Hot-path timers/counters (/botstats); off, every probe is a no-op
+METRICS.enabled = CFG.metrics_enabled
+_t = _phase("config", _t)
+
 # -------------------------
 # Intents
 # -------------------------
@@ -51,19 +83,96 @@ bot = commands.Bot(command_prefix="!",
                    intents=intents)  # prefix kept only for legacy
 _synced = False  # flag so we don't resync on reconnect
 
+# Read settings through bot.config: a hot reload swaps in a new Config
+bot.config = CFG
+bot.config_watcher = ConfigWatcher(bot, interval=CFG.config_watch_seconds)
+
+# Per-user locks plus the storage-wide writer lock, shared by every cog
+bot.locks = LockManager()
+# Single storage service shared by every cog (read it via `self.bot.storage`)
+bot.storage = get_storage_instance(DEFAULT_PATH,
+                                   backend=CFG.storage_backend,
+                                   lock=bot.locks.storage)
+# channel id -> (user id, status); drops untracked channels in O(1)
+bot.router = ChannelRouter(bot.storage)
+
+# The one on_message path for tracked channels; cogs register handlers
+bot.dispatcher = MessageDispatcher(bot.router, bot.storage)
+bot.add_listener(bot.dispatcher.on_message, "on_message")
+
+# Blocking openpyxl work runs here, off the event loop, ordered per user
+bot.workbooks = WorkbookExecutor(
+    max_workers=CFG.workbook_workers,
+    locks=bot.locks)
+
+# Link events are the system of record; workbooks are views derived from them
+bot.events = LinkEventStore()
+# Counted as events are appended; the reports' startup scan recounts them
+bot.counters = ReplyCounters(bot.storage, bot.events)
+bot.reports = ReportViews(bot.storage,
+                          bot.events,
+                          bot.workbooks,
+                          refresh_seconds=CFG.report_refresh_seconds,
+                          counters=bot.counters)
+bot.seen_links = SeenLinks(bot.storage,
+                           bot.events,
+                           scope=CFG.dedupe_scope)
+# Admin-channel posts are batched into digests; errors go out immediately
+bot.admin_log = AdminLog(bot,
+                         CFG.admin_channel_id,
+                         digest_seconds=CFG.admin_log_digest_seconds,
+                         immediate_level=CFG.admin_log_immediate_level)
+
+# Reports callbacks that hold the event loop (stack, cog, command) in digests
+bot.watchdog = LoopWatchdog(
+    bot,
+    threshold=CFG.loop_block_threshold_ms / 1000,
+    summary_seconds=CFG.loop_watchdog_summary_seconds)
+
+bot.metrics = METRICS
+METRICS.gauge("roster.users", lambda: len(bot.storage.list_users()))
+METRICS.gauge("router.channels", lambda: len(bot.router))
+METRICS.gauge("locks.held", lambda: len(bot.locks))
+METRICS.gauge("loop.tasks", lambda: len(asyncio.all_tasks()))
+_t = _phase("services", _t)
+
+
+async def apply_config(old, new):
+    """Hand reloaded tunables to the services built above."""
+    METRICS.enabled = new.metrics_enabled
+    if new.metrics_enabled:
+        # off at boot means the sampler never started; no-op if running
+        METRICS.start_lag_sampler(new.metrics_lag_interval)
+    bot.reports.refresh_seconds = new.report_refresh_seconds
+    bot.admin_log.digest_seconds = new.admin_log_digest_seconds
+    bot.admin_log.immediate_level = new.admin_log_immediate_level
+    bot.watchdog.summary_seconds = new.loop_watchdog_summary_seconds
+    if new.loop_block_threshold_ms != old.loop_block_threshold_ms:
+        bot.watchdog.set_threshold(new.loop_block_threshold_ms / 1000)
+
+
+bot.add_listener(apply_config, "on_config_reload")
+
 
 # -------------------------
 # Cog Loader
 # -------------------------
 async def load_cogs():
-    for file in os.listdir("./cogs"):
-        if file.endswith(".py"):
-            module = f"cogs.{file[:-3]}"
-            try:
-                await bot.load_extension(module)
-                log.info("✅ Loaded cog: %s", module)
-            except Exception as e:
-                log.exception("❌ Failed to load %s: %s", module, e)
+    """Load every cog concurrently; one failing cog doesn't stop the rest."""
+    modules = sorted(f"cogs.{file[:-3]}" for file in os.listdir("./cogs")
+                     if file.endswith(".py"))
+
+    async def load(module):
+        start = time.perf_counter()
+        try:
+            await bot.load_extension(module)
+        except Exception as e:
+            log.exception("❌ Failed to load %s: %s", module, e)
+            return
+        log.info("✅ Loaded cog: %s (%.1f ms)", module,
+                 (time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(load(m) for m in modules))
 
 
 # -------------------------
@@ -80,10 +189,12 @@ async def on_ready():
         synced = await bot.tree.sync(guild=guild)
         log.info("✅ Synced %d commands to guild %s", len(synced), GUILD_ID)
         _synced = True
+        _phase("ready", _t)
+        log.info("🚀 Ready in %.2fs (%s)", time.perf_counter() - _T0,
+                 ", ".join(f"{name} {sec * 1000:.0f} ms"
+                           for name, sec in _timeline))
 
-    admin_log = bot.get_channel(ADMIN_LOG_CHANNEL)
-    if admin_log:
-        await admin_log.send(f"✅ Bot online as **{bot.user}**")
+    bot.admin_log.log(f"✅ Bot online as **{bot.user}**")
 
 
 # -------------------------
@@ -108,10 +219,8 @@ async def resync(interaction: discord.Interaction):
 async def on_app_command_error(interaction: discord.Interaction,
                                error: app_commands.AppCommandError):
     log.exception("Slash command error: %s", error)
-    admin_log = bot.get_channel(ADMIN_LOG_CHANNEL)
-    if admin_log:
-        await admin_log.send(
-            f"⚠️ Error: `{error}` from {interaction.user.mention}")
+    bot.admin_log.log(f"⚠️ Error: `{error}` from {interaction.user.mention}",
+                      logging.ERROR)
     if not interaction.response.is_done():
         await interaction.response.send_message(
             "⚠️ Internal error. Admins notified.", ephemeral=True)
@@ -121,12 +230,40 @@ async def on_app_command_error(interaction: discord.Interaction,
 # Entrypoint
 # -------------------------
 async def main():
-    async with bot:
-        await load_cogs()
-        token = os.getenv("DISCORD_TOKEN")
-        if not token:
-            raise RuntimeError("❌ DISCORD_TOKEN not found in environment!")
-        await bot.start(token)
+    global _t
+    try:
+        async with bot:
+            token = os.getenv("DISCORD_TOKEN")
+            if not token:
+                raise RuntimeError("❌ DISCORD_TOKEN not found in environment!")
+            await bot.reports.start()
+            bot.admin_log.start()
+            bot.watchdog.start()
+            bot.config_watcher.start()
+            METRICS.start_lag_sampler(CFG.metrics_lag_interval)
+            if METRICS.enabled and CFG.metrics_port:
+                await METRICS.serve(CFG.metrics_port)
+            _t = _phase("reports", _t)
+
+            # bot.start() is login + connect: cogs load while the login
+            # request is in flight
+            login = asyncio.create_task(bot.login(token))
+            await load_cogs()
+            _phase("cogs", _t)
+            await login
+            _t = _phase("login", _t)
+            await bot.connect()
+    finally:
+        await bot.config_watcher.close()
+        await METRICS.close()
+        await bot.watchdog.close()
+        await bot.admin_log.close()
+        # let queued workbook writes land, then flush write-behind storage
+        bot.reports.close()
+        bot.workbooks.shutdown(wait=True)
+        bot.counters.close()
+        bot.seen_links.close()
+        bot.storage.close()
 
 
 if __name__ == "__main__":
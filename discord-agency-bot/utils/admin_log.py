@@ -0,0 +1,269 @@
+"""
+Admin-log service.
+
+Cogs used to post one admin-channel message per event (every logged link
+batch, every /pause, every dashboard view...), which drains the channel's
+rate-limit bucket under load and delays user-facing replies sharing it.
+`AdminLog` queues events instead and posts one digest embed every
+`digest_seconds`, e.g. "42 users logged 311 links". Identical lines are
+collapsed with a count and attachments ride along with the digest.
+
+Entries at or above `immediate_level` (ERROR by default) skip the queue
+and are posted right away. All posts go out one at a time, so a burst of
+errors queues behind itself rather than hammering the API.
+
+A digest is split across messages within Discord's limits. Entries whose
+message fails to post are queued again for the next digest; if that one
+fails too, their files go out with a short text note instead.
+
+Usage from a cog:
+    self.bot.admin_log.log("⏸️ @user paused tracking")
+    self.bot.admin_log.log(f"🔥 Cleanup error: {tb}", logging.ERROR)
+    self.bot.admin_log.links(user_id, len(events))
+"""
+
+import asyncio
+import logging
+from collections import Counter
+from pathlib import Path
+from typing import List, NamedTuple, Optional
+
+import discord
+
+DEFAULT_DIGEST_SECONDS = 60.0
+DEFAULT_IMMEDIATE_LEVEL = logging.ERROR
+MAX_QUEUED = 500  # older entries are dropped (and counted) past this
+
+# Discord limits per message
+MAX_EMBEDS = 10
+MAX_FILES = 10
+MAX_DESCRIPTION = 4000
+MAX_EMBED_TOTAL = 6000  # characters across all embeds of one message
+
+
+def parse_level(value, default: int = DEFAULT_IMMEDIATE_LEVEL) -> int:
+    """'ERROR' / 'warning' / 40 -> logging level number."""
+    if value in (None, ""):
+        return default
+    if isinstance(value, int) or str(value).isdigit():
+        return int(value)
+    level = logging.getLevelName(str(value).upper())
+    return level if isinstance(level, int) else default
+
+
+class _Entry(NamedTuple):
+    level: int
+    message: str
+    file: Optional[Path]
+    embed: Optional[discord.Embed]
+    retried: bool = False
+
+
+class AdminLog:
+
+    def __init__(self,
+                 bot,
+                 channel_id: int,
+                 digest_seconds: float = DEFAULT_DIGEST_SECONDS,
+                 immediate_level: int = DEFAULT_IMMEDIATE_LEVEL):
+        self.bot = bot
+        self.channel_id = channel_id
+        self.digest_seconds = digest_seconds
+        self.immediate_level = immediate_level
+
+        self._queue: List[_Entry] = []
+        self._dropped = 0
+        self._links = Counter()  # user_id -> links logged since last digest
+        self._send_lock = asyncio.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._urgent: set[asyncio.Task] = set()
+
+    # ---- Producers (sync, never block the caller) ----
+    def log(self,
+            message: str,
+            level: int = logging.INFO,
+            file: Optional[Path] = None,
+            embed: Optional[discord.Embed] = None):
+        entry = _Entry(level, message, file, embed)
+        if level >= self.immediate_level:
+            self._spawn(self._send_entries([entry]))
+            return
+        self._queue.append(entry)
+        if len(self._queue) > MAX_QUEUED:
+            del self._queue[0]
+            self._dropped += 1
+
+    def links(self, user_id: str, count: int):
+        """Count links logged by a user, summarized in the next digest."""
+        self._links[user_id] += count
+
+    # ---- Lifecycle ----
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def close(self):
+        """Stop the digest loop; entries that cannot be posted are printed."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+        if self._urgent:
+            await asyncio.gather(*self._urgent, return_exceptions=True)
+        try:
+            await asyncio.wait_for(self.flush(), timeout=5)
+        except Exception:
+            pass
+        for entry in self._queue:
+            print(f"[admin-log] {entry.message}")
+        self._queue.clear()
+
+    async def flush(self):
+        """Post the digest for everything queued so far."""
+        if not self._queue and not self._links and not self._dropped:
+            return
+        channel = await self._channel()
+        if channel is None:
+            return  # not connected yet: keep queueing
+
+        entries, self._queue = self._queue, []
+        links, self._links = self._links, Counter()
+        dropped, self._dropped = self._dropped, 0
+        try:
+            await self._post_digest(channel, entries, links, dropped)
+        except Exception as e:
+            print(f"⚠️ Failed to send admin digest: {e}")
+
+    # ---- Internals ----
+    async def _run(self):
+        while True:
+            await asyncio.sleep(self.digest_seconds)
+            try:
+                await self.flush()
+            except Exception as e:
+                print(f"⚠️ Admin digest loop error: {e}")
+
+    def _spawn(self, coro):
+        task = asyncio.create_task(coro)
+        self._urgent.add(task)
+        task.add_done_callback(self._urgent.discard)
+
+    async def _channel(self):
+        if not self.channel_id:
+            return None
+        ch = self.bot.get_channel(self.channel_id)
+        if ch is None and self.bot.is_ready():
+            try:
+                ch = await self.bot.fetch_channel(self.channel_id)
+            except Exception:
+                return None
+        return ch
+
+    async def _send_entries(self, entries: List[_Entry]):
+        channel = await self._channel()
+        if channel is None:
+            self._queue.extend(entries)  # post them with the next digest
+            return
+        for entry in entries:
+            try:
+                async with self._send_lock:
+                    if entry.embed is not None:
+                        await channel.send(embed=entry.embed,
+                                           file=self._file(entry.file))
+                    else:
+                        await channel.send(entry.message[:2000],
+                                           file=self._file(entry.file))
+            except Exception as e:
+                print(f"⚠️ Failed to send admin log: {e}")
+
+    @staticmethod
+    def _file(path: Optional[Path]):
+        if path and Path(path).exists():
+            return discord.File(str(path))
+        return discord.utils.MISSING
+
+    async def _post_digest(self, channel, entries: List[_Entry],
+                           links: Counter, dropped: int):
+        lines = []
+        if links:
+            lines.append(f"📝 **{len(links)}** user(s) logged "
+                         f"**{sum(links.values())}** link(s)")
+        # identical messages collapse to one line with a count
+        for message, n in Counter(e.message for e in entries
+                                  if e.embed is None).items():
+            lines.append(message if n == 1 else f"{message} (×{n})")
+        if dropped:
+            lines.append(f"… {dropped} older entries dropped")
+
+        description = ""
+        for i, line in enumerate(lines):
+            if len(description) + len(line) + 1 > MAX_DESCRIPTION:
+                description += f"\n…and {len(lines) - i} more"
+                break
+            description += ("\n" if description else "") + line
+
+        # (embed, file, entries it delivers) per part of the digest
+        parts = []
+        if description:
+            embed = discord.Embed(
+                title=f"🗒️ Admin digest (last {int(self.digest_seconds)}s)",
+                description=description,
+                color=discord.Color.blurple())
+            parts.append((embed, None, [
+                e for e in entries if e.embed is None and e.file is None
+            ]))
+        for e in entries:
+            file = e.file if e.file and Path(e.file).exists() else None
+            if e.embed is not None or file is not None:
+                parts.append((e.embed, file, [e]))
+
+        async with self._send_lock:
+            for chunk in self._chunks(parts):
+                embeds = [embed for embed, _, _ in chunk if embed is not None]
+                files = [file for _, file, _ in chunk if file is not None]
+                try:
+                    await channel.send(
+                        embeds=embeds,
+                        files=[discord.File(str(p)) for p in files])
+                except Exception as e:
+                    print(f"⚠️ Failed to send admin digest: {e}")
+                    failed = [entry for _, _, part in chunk for entry in part]
+                    await self._retry_later(channel, failed, files, e)
+
+    @staticmethod
+    def _chunks(parts: list):
+        """Group digest parts into messages within Discord's limits."""
+        chunk, embeds, size, files = [], 0, 0, 0
+        for part in parts:
+            embed, file, _ = part
+            n = len(embed) if embed is not None else 0
+            if chunk and (embeds + (embed is not None) > MAX_EMBEDS
+                          or size + n > MAX_EMBED_TOTAL
+                          or files + (file is not None) > MAX_FILES):
+                yield chunk
+                chunk, embeds, size, files = [], 0, 0, 0
+            chunk.append(part)
+            embeds += embed is not None
+            size += n
+            files += file is not None
+        if chunk:
+            yield chunk
+
+    async def _retry_later(self, channel, entries: List[_Entry],
+                           files: List[Path], error: Exception):
+        # caller holds self._send_lock
+        fresh = [e for e in entries if not e.retried]
+        self._queue[:0] = [e._replace(retried=True) for e in fresh]
+        if len(fresh) == len(entries):
+            return
+        # failed twice: keep the files (archived reports...) and the text
+        lost = [e for e in entries if e.retried]
+        for e in lost:
+            print(f"[admin-log] {e.message}")
+        lost_files = [p for p in files if any(e.file == p for e in lost)]
+        try:
+            await channel.send(
+                f"⚠️ {len(lost)} admin log entries could not be posted "
+                f"({error}); their text is in the bot console."[:2000],
+                files=[discord.File(str(p)) for p in lost_files])
+        except Exception as e:
+            print(f"⚠️ Failed to send admin log fallback: {e}")
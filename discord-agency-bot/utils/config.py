@@ -0,0 +1,343 @@
+"""
+Bot configuration.
+
+config.json is parsed and validated once, at startup, into a read-only
+`Config` (ids are ints, durations floats, levels logging numbers) shared
+through `bot.config`. Every key is read here, with its default, instead
+of in each cog; the old alternative spellings a few cogs accepted
+(`guild_id`, `ROLE`, `cleanup_hours`, ...) are still read, with a warning.
+
+`ConfigWatcher` polls the file's mtime. When it changes the file is
+parsed again and, if valid, a new `Config` replaces `bot.config` and the
+`config_reload` event (`on_config_reload(old, new)`) is dispatched, so
+tunables such as CLEANUP_HOURS or LINK_BATCH_SIZE apply without a
+restart. Settings that are wired into objects built at startup (ids, the
+storage backend, worker counts, ...) keep their running value until the
+bot restarts. An invalid file is reported and the running config kept.
+
+Cogs that need a value at import time (GUILD_ID for @app_commands.guilds)
+call `load_config()`, which returns the current config.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from utils.admin_log import (DEFAULT_DIGEST_SECONDS, DEFAULT_IMMEDIATE_LEVEL,
+                             parse_level)
+from utils.link_ingest import DEFAULT_BATCH_SIZE, DEFAULT_FLUSH_SECONDS
+from utils.loop_watchdog import DEFAULT_SUMMARY_SECONDS, DEFAULT_THRESHOLD
+from utils.metrics import DEFAULT_LAG_INTERVAL
+from utils.report_views import DEFAULT_REFRESH_SECONDS
+from utils.seen_links import SCOPES
+from utils.storage_backends import BACKENDS
+from utils.storage_utils import DEFAULT_BACKEND
+from utils.workbook_executor import DEFAULT_WORKERS
+
+CONFIG_PATH = Path("config.json")
+DEFAULT_WATCH_SECONDS = 5.0
+
+# Old spellings some cogs used to accept -> the key that replaced them; when
+# several are set, the first one wins, as it did in those cogs
+ALIASES = {
+    "guild_id": "GUILD_ID",
+    "role_id": "TRACKED_ROLE_ID",
+    "ROLE": "TRACKED_ROLE_ID",
+    "reply_guy_role_id": "TRACKED_ROLE_ID",
+    "ROLE_ID": "TRACKED_ROLE_ID",
+    "category_id": "CATEGORY_ID",
+    "CATEGORY": "CATEGORY_ID",
+    "admin_log_channel": "ADMIN_CHANNEL_ID",
+    "admin_log_channel_id": "ADMIN_CHANNEL_ID",
+    "ADMIN_LOG_CHANNEL_ID": "ADMIN_CHANNEL_ID",
+    "cleanup_hours": "CLEANUP_HOURS",
+}
+
+
+class ConfigError(ValueError):
+    """config.json is missing, unreadable or has invalid values."""
+
+
+# ---- Value parsers: raw JSON value -> typed value, ValueError if invalid ----
+def _id(value) -> int:
+    value = int(value)
+    if value <= 0:
+        raise ValueError("must be a positive id")
+    return value
+
+
+def _positive_int(value) -> int:
+    value = int(value)
+    if value <= 0:
+        raise ValueError("must be > 0")
+    return value
+
+
+def _positive_float(value) -> float:
+    value = float(value)
+    if value <= 0:
+        raise ValueError("must be > 0")
+    return value
+
+
+def _non_negative_float(value) -> float:
+    value = float(value)
+    if value < 0:
+        raise ValueError("must be >= 0")
+    return value
+
+
+def _port(value) -> int:
+    value = int(value)
+    if not 0 <= value <= 65535:
+        raise ValueError("must be a port number (0 to disable)")
+    return value
+
+
+def _bool(value) -> bool:
+    if isinstance(value, bool):
+        return value
+    text = str(value).strip().lower()
+    if text in ("1", "true", "yes", "on"):
+        return True
+    if text in ("0", "false", "no", "off"):
+        return False
+    raise ValueError("must be true or false")
+
+
+def _level(value) -> int:
+    level = parse_level(value, default=-1)
+    if level < 0:
+        raise ValueError("must be a logging level name or number")
+    return level
+
+
+def _choice(*choices: str) -> Callable[[object], str]:
+
+    def parse(value) -> str:
+        value = str(value).lower()
+        if value not in choices:
+            raise ValueError(f"must be one of {', '.join(choices)}")
+        return value
+
+    return parse
+
+
+# attribute -> (config.json key, parser, default (None: required), reloadable)
+FIELDS: Dict[str, Tuple[str, Callable, object, bool]] = {
+    "guild_id": ("GUILD_ID", _id, None, False),
+    "tracked_role_id": ("TRACKED_ROLE_ID", _id, None, False),
+    "category_id": ("CATEGORY_ID", _id, None, False),
+    "admin_channel_id": ("ADMIN_CHANNEL_ID", _id, None, False),
+    "admin_role_id": ("ADMIN_ROLE_ID", _id, None, False),
+    "application_id": ("APPLICATION_ID", _id, None, False),
+    "storage_backend": ("STORAGE_BACKEND", _choice(*BACKENDS),
+                        DEFAULT_BACKEND, False),
+    "workbook_workers": ("WORKBOOK_WORKERS", _positive_int, DEFAULT_WORKERS,
+                         False),
+    "dedupe_scope": ("DEDUPE_SCOPE", _choice(*SCOPES), "user", False),
+    "report_refresh_seconds": ("REPORT_REFRESH_SECONDS", _positive_float,
+                               DEFAULT_REFRESH_SECONDS, True),
+    "link_flush_seconds": ("LINK_FLUSH_SECONDS", _positive_float,
+                           DEFAULT_FLUSH_SECONDS, True),
+    "link_batch_size": ("LINK_BATCH_SIZE", _positive_int, DEFAULT_BATCH_SIZE,
+                        True),
+    "setup_concurrency": ("SETUP_CONCURRENCY", _positive_int, 4, True),
+    "cleanup_hours": ("CLEANUP_HOURS", _positive_float, 6.0, True),
+    "cleanup_debounce_seconds": ("CLEANUP_DEBOUNCE_SECONDS",
+                                 _non_negative_float, 5.0, True),
+    "cleanup_concurrency": ("CLEANUP_CONCURRENCY", _positive_int, 4, True),
+    "admin_log_digest_seconds": ("ADMIN_LOG_DIGEST_SECONDS", _positive_float,
+                                 DEFAULT_DIGEST_SECONDS, True),
+    "admin_log_immediate_level": ("ADMIN_LOG_IMMEDIATE_LEVEL", _level,
+                                  DEFAULT_IMMEDIATE_LEVEL, True),
+    "metrics_enabled": ("METRICS_ENABLED", _bool, True, True),
+    "metrics_port": ("METRICS_PORT", _port, 0, False),
+    "metrics_lag_interval": ("METRICS_LAG_INTERVAL", _positive_float,
+                             DEFAULT_LAG_INTERVAL, False),
+    "loop_block_threshold_ms": ("LOOP_BLOCK_THRESHOLD_MS",
+                                _non_negative_float,
+                                DEFAULT_THRESHOLD * 1000, True),
+    "loop_watchdog_summary_seconds": ("LOOP_WATCHDOG_SUMMARY_SECONDS",
+                                      _positive_float,
+                                      DEFAULT_SUMMARY_SECONDS, True),
+    "config_watch_seconds": ("CONFIG_WATCH_SECONDS", _non_negative_float,
+                             DEFAULT_WATCH_SECONDS, False),
+}
+
+
+class Config:
+
+    __slots__ = tuple(FIELDS)
+
+    def __init__(self, **values):
+        for name in self.__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError("Config is read-only; edit config.json")
+
+    __delattr__ = __setattr__
+
+    @classmethod
+    def from_dict(cls, raw: dict) -> "Config":
+        """Validate raw config.json contents; ConfigError lists every problem."""
+        raw = dict(raw)
+        for old, key in ALIASES.items():
+            if raw.get(old) not in (None, "") and raw.get(key) in (None, ""):
+                print(f"⚠️ Config: `{old}` is deprecated, rename it to `{key}`")
+                raw[key] = raw[old]
+
+        values, problems = {}, []
+        for name, (key, parse, default, _) in FIELDS.items():
+            value = raw.get(key)
+            if value in (None, ""):
+                if default is None:
+                    problems.append(f"{key} is missing")
+                values[name] = default
+                continue
+            try:
+                values[name] = parse(value)
+            except (TypeError, ValueError) as e:
+                problems.append(f"{key}={value!r}: {e}")
+        if problems:
+            raise ConfigError("; ".join(problems))
+        return cls(**values)
+
+    @classmethod
+    def load(cls, path: str | Path = CONFIG_PATH) -> "Config":
+        try:
+            with open(path, "r") as f:
+                raw = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ConfigError(f"cannot read {path}: {e}") from None
+        if not isinstance(raw, dict):
+            raise ConfigError(f"{path} must hold a JSON object")
+        return cls.from_dict(raw)
+
+    def replace(self, **changes) -> "Config":
+        values = {name: getattr(self, name) for name in self.__slots__}
+        values.update(changes)
+        return Config(**values)
+
+    def diff(self, other: "Config") -> List[str]:
+        """Names of the fields whose value differs in `other`."""
+        return [
+            name for name in self.__slots__
+            if getattr(self, name) != getattr(other, name)
+        ]
+
+    def __eq__(self, other):
+        if not isinstance(other, Config):
+            return NotImplemented
+        return not self.diff(other)
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}"
+                           for name in self.__slots__)
+        return f"Config({fields})"
+
+
+_config: Optional[Config] = None
+_lock = threading.Lock()
+
+
+def load_config(path: str | Path = CONFIG_PATH) -> Config:
+    """The current config; config.json is parsed on the first call."""
+    global _config
+    with _lock:
+        if _config is None:
+            _config = Config.load(path)
+        return _config
+
+
+def _set_current(config: Config):
+    global _config
+    with _lock:
+        _config = config
+
+
+class ConfigWatcher:
+    """Reloads `bot.config` when config.json changes on disk."""
+
+    def __init__(self,
+                 bot,
+                 path: str | Path = CONFIG_PATH,
+                 interval: float = DEFAULT_WATCH_SECONDS):
+        self.bot = bot
+        self.path = Path(path)
+        self.interval = interval
+        self._signature = self._stat()
+        self._task: Optional[asyncio.Task] = None
+
+    # ---- Lifecycle ----
+    def start(self):
+        """Poll every `interval` seconds; 0 disables hot reload."""
+        if self._task is None and self.interval > 0:
+            self._task = asyncio.create_task(self._watch())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    async def _watch(self):
+        while True:
+            await asyncio.sleep(self.interval)
+            signature = self._stat()
+            if signature != self._signature:
+                self._signature = signature
+                try:
+                    self.reload()
+                except Exception as e:
+                    print(f"⚠️ Config reload failed: {e}")
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    # ---- Reload ----
+    def reload(self) -> List[str]:
+        """
+        Parse config.json again and apply what changed; returns the names
+        of the fields now in effect with a new value.
+        """
+        old = self.bot.config
+        try:
+            new = Config.load(self.path)
+        except ConfigError as e:
+            print(f"⚠️ Config not reloaded, keeping the running one: {e}")
+            self.bot.admin_log.log(
+                f"⚠️ config.json not reloaded, keeping the running config: "
+                f"{e}", logging.WARNING)
+            return []
+
+        pinned = [name for name in old.diff(new) if not FIELDS[name][3]]
+        if pinned:
+            keys = ", ".join(FIELDS[name][0] for name in pinned)
+            print(f"⚠️ Config: {keys} changed; takes effect after a restart")
+            self.bot.admin_log.log(
+                f"⚠️ config.json: {keys} changed; takes effect after a "
+                f"restart", logging.WARNING)
+            new = new.replace(**{name: getattr(old, name) for name in pinned})
+
+        changed = old.diff(new)
+        if not changed:
+            return []
+        self.bot.config = new
+        _set_current(new)
+        summary = ", ".join(f"{FIELDS[name][0]}={getattr(new, name)}"
+                            for name in changed)
+        print(f"🔄 Config reloaded: {summary}")
+        self.bot.admin_log.log(f"🔄 config.json reloaded: {summary}")
+        self.bot.dispatch("config_reload", old, new)
+        return changed
@@ -0,0 +1,76 @@
+"""
+Message dispatcher.
+
+The single on_message listener for tracked channels. For each message it
+resolves the channel route and the author's record once, then hands a
+`MessageContext` to the handlers registered for the channel owner's
+status, e.g. setup for "pending" users and link tracking for "active"
+ones. Handlers never repeat the lookups, and a new message-driven feature
+is one more `register()` call rather than another listener doing its own
+storage reads.
+"""
+
+from typing import Awaitable, Callable, Dict, Iterable, List, NamedTuple
+
+import discord
+
+from utils.metrics import METRICS
+from utils.models import TrackedUser, UserStatus
+
+
+class MessageContext(NamedTuple):
+    user_id: str  # author, who is also the channel owner
+    channel_id: int
+    status: UserStatus
+    user: TrackedUser
+
+
+Handler = Callable[[discord.Message, MessageContext], Awaitable[None]]
+
+
+class MessageDispatcher:
+
+    def __init__(self, router, storage):
+        self.router = router
+        self.storage = storage
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    def register(self, statuses: Iterable[str], handler: Handler):
+        for status in statuses:
+            handlers = self._handlers.setdefault(status, [])
+            if handler not in handlers:
+                handlers.append(handler)
+
+    def unregister(self, handler: Handler):
+        for handlers in self._handlers.values():
+            if handler in handlers:
+                handlers.remove(handler)
+
+    async def on_message(self, message: discord.Message):
+        if message.author.bot:
+            return
+
+        route = self.router.lookup(message.channel.id)
+        if route is None:
+            return  # not a tracked channel
+        owner_id, status = route
+        handlers = self._handlers.get(status)
+        if not handlers:
+            return
+
+        user_id = str(message.author.id)
+        if user_id != owner_id:
+            return  # e.g. an admin talking in a user's channel
+
+        user = self.storage.get_user(user_id)  # the one lookup
+        if user is None:
+            return
+        ctx = MessageContext(user_id, message.channel.id, status, user)
+
+        with METRICS.timer("dispatch.message"):
+            for handler in list(handlers):
+                try:
+                    await handler(message, ctx)
+                except Exception as e:
+                    METRICS.inc("dispatch.errors")
+                    print(f"⚠️ Message handler {handler.__qualname__} failed: {e}")
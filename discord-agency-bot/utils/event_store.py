@@ -0,0 +1,108 @@
+"""
+Link event store.
+
+Every tracked link is one compact, append-only event and the event log is
+the system of record for replies. The per-user workbooks in data/reports
+are derived from it (see utils/report_views.py).
+
+On disk: data/events/links.jsonl, one JSON array per line:
+    [user_id, "YYYY-MM-DD", tweet_id, message_id, unix_ts]
+"""
+
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Iterator, List, NamedTuple, Optional
+
+from utils.x_links import canonical_url
+
+DEFAULT_EVENTS_PATH = Path("data/events/links.jsonl")
+
+# listener(events, end_offset) -- runs under the append lock, in log order
+AppendListener = Callable[[List["LinkEvent"], int], None]
+
+
+class LinkEvent(NamedTuple):
+    user_id: str
+    date: str  # YYYY-MM-DD
+    tweet_id: str
+    message_id: str
+    ts: int
+
+    @property
+    def url(self) -> str:
+        """Canonical link for the tweet, used when materializing reports."""
+        return canonical_url(self.tweet_id)
+
+
+class LinkEventStore:
+
+    def __init__(self, path: str | Path = DEFAULT_EVENTS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        self._listeners: List[AppendListener] = []
+        self._terminate_torn_line()
+
+    def subscribe(self, listener: AppendListener):
+        """Call `listener(events, end_offset)` after every durable append."""
+        self._listeners.append(listener)
+
+    def _terminate_torn_line(self):
+        # A crash mid-append can leave a partial last line; end it so the
+        # next append starts on a fresh line instead of merging into it.
+        if not self.path.exists() or self.path.stat().st_size == 0:
+            return
+        with open(self.path, "rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    def append(self, events: List[LinkEvent]):
+        """Append `events` and fsync; blocking, call from the executor."""
+        if not events:
+            return
+        payload = "".join(
+            json.dumps(list(ev), separators=(",", ":")) + "\n"
+            for ev in events)
+        with self._lock:
+            with open(self.path, "a") as f:
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+                end_offset = f.tell()
+            for listener in self._listeners:
+                try:
+                    listener(events, end_offset)
+                except Exception as e:
+                    print(f"⚠️ Link event listener failed: {e}")
+
+    def end_offset(self) -> int:
+        """Byte offset just past the last durable append."""
+        with self._lock:
+            return self.path.stat().st_size if self.path.exists() else 0
+
+    def iter_events(self,
+                    start: int = 0,
+                    end: Optional[int] = None) -> Iterator[LinkEvent]:
+        """
+        Stream events in append order, from byte offset `start` up to `end`
+        (offsets seen by a listener, or `end_offset()`); a torn last line is
+        skipped.
+        """
+        if not self.path.exists():
+            return
+        with open(self.path, "rb") as f:
+            f.seek(start)
+            position = start
+            for line in f:
+                position += len(line)
+                if end is not None and position > end:
+                    break
+                try:
+                    user_id, day, tweet_id, message_id, ts = json.loads(line)
+                except ValueError:
+                    continue
+                yield LinkEvent(str(user_id), day, str(tweet_id),
+                                str(message_id), int(ts))
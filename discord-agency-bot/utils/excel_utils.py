@@ -1,14 +1,24 @@
+import os
 from pathlib import Path
-import openpyxl
-from openpyxl import Workbook
-from openpyxl.styles import Alignment
 from datetime import datetime, date, timedelta
 import re
-from typing import List, Optional
+from contextlib import nullcontext
+from typing import Callable, ContextManager, Dict, List, Optional
 
-# Ensure reports directory exists
+# openpyxl is imported inside the functions that need it: it is the
+# slowest import of the bot and most processes touch no workbook at start.
+
+# Created on first write
 REPORTS_DIR = Path("data/reports")
-REPORTS_DIR.mkdir(parents=True, exist_ok=True)
+ARCHIVE_DIR = Path("data/archive")
+
+# Hidden sheet mapping each date to its column and next free row, so
+# locating where a link goes needs no scan of the reply sheet.
+# Rows: ["date", "column", "next_row"] header, then one row per date, plus
+# a NEXT_COLUMN_KEY row holding the first unused column.
+INDEX_SHEET = "_index"
+NEXT_COLUMN_KEY = "__next_column__"
+FIRST_LINK_ROW = 3
 
 
 def _sanitize_filename(name: str) -> str:
@@ -27,7 +37,10 @@ def create_user_excel(user_id: str | None, username: str, start_date: date,
     if isinstance(end_date, str):
         end_date = datetime.strptime(end_date, "%Y-%m-%d").date()
 
+    from openpyxl import Workbook
+
     safe_username = _sanitize_filename(username)
+    REPORTS_DIR.mkdir(parents=True, exist_ok=True)
     path = REPORTS_DIR / f"{safe_username}.xlsx"
 
     wb = Workbook()
@@ -36,12 +49,15 @@ def create_user_excel(user_id: str | None, username: str, start_date: date,
 
     # Header row: column A = "Day", then date columns
     ws.cell(row=1, column=1, value="Day")
+    index = {}
     day = start_date
     col = 2
     while day <= end_date:
         ws.cell(row=1, column=col, value=day.isoformat())
+        index[day.isoformat()] = [col, FIRST_LINK_ROW]
         col += 1
         day += timedelta(days=1)
+    index[NEXT_COLUMN_KEY] = [col, None]
 
     # Metadata row for target
     ws.cell(row=2, column=1, value="Target")
@@ -50,6 +66,7 @@ def create_user_excel(user_id: str | None, username: str, start_date: date,
     ws.row_dimensions[1].height = 20
     ws.sheet_view.showGridLines = True
 
+    _save_index(wb, index)
     wb.save(path)
     return path
 
@@ -61,6 +78,13 @@ def get_user_excel_path(username: str) -> Optional[Path]:
     return path if path.exists() else None
 
 
+def archive_path(username: str) -> Path:
+    """Timestamped destination in ARCHIVE_DIR for a user's final report."""
+    ARCHIVE_DIR.mkdir(parents=True, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%SZ")
+    return ARCHIVE_DIR / f"{username}-{stamp}.xlsx"
+
+
 def _find_date_column(ws, date_iso: str) -> Optional[int]:
     """Find the column index for the given date string (YYYY-MM-DD)."""
     for col in range(2, ws.max_column + 1):
@@ -70,16 +94,83 @@ def _find_date_column(ws, date_iso: str) -> Optional[int]:
     return None
 
 
+def count_links_by_date(path: Path) -> Dict[str, int]:
+    """
+    Count recorded links per date column. Row 1 holds the dates, row 2 the
+    Target metadata (not a reply), links start at row 3. Formulas are read
+    as written: openpyxl-saved files carry no cached values.
+    """
+    import openpyxl
+
+    wb = openpyxl.load_workbook(path, read_only=True)
+    try:
+        rows = wb.active.iter_rows(values_only=True)
+        header = next(rows, ())
+        next(rows, None)  # Target row
+        counts: Dict[str, int] = {}
+        for row in rows:
+            for col in range(1, min(len(row), len(header))):
+                day = header[col]
+                if day and row[col] not in (None, ""):
+                    counts[day] = counts.get(day, 0) + 1
+        return counts
+    finally:
+        wb.close()
+
+
+def build_master_report(
+        sources: List[Path],
+        dest: Path,
+        progress: Optional[Callable[[int, int], None]] = None,
+        guard: Optional[Callable[[Path], ContextManager]] = None) -> Path:
+    """
+    Copy the active sheet of every source workbook into one sheet each of
+    `dest`. Sources are opened read-only and the master is a write-only
+    workbook, so rows stream through instead of being held in memory.
+    `progress(done, total)` is called after each source; each source is
+    read inside `guard(path)` when given (e.g. its owner's lock).
+    """
+    import openpyxl
+
+    master = openpyxl.Workbook(write_only=True)
+    total = len(sources)
+    for done, file in enumerate(sources, start=1):
+        try:
+            with guard(file) if guard else nullcontext():
+                wb = openpyxl.load_workbook(file, read_only=True)
+                try:
+                    new_ws = master.create_sheet(title=file.stem[:30])
+                    for row in wb.active.iter_rows(values_only=True):
+                        new_ws.append(row)
+                finally:
+                    wb.close()
+        except Exception as e:
+            print(f"⚠️ Skipping {file}: {e}")
+        if progress:
+            progress(done, total)
+
+    # write beside the destination, then swap it in
+    tmp = dest.with_name(dest.stem + ".tmp.xlsx")
+    master.save(tmp)
+    os.replace(tmp, dest)
+    return dest
+
+
 def record_links(username: str, target_date: date | datetime,
                  links: List[str]) -> bool:
     """
     Record links for the given username on target_date.
     Each link is stored as an Excel HYPERLINK with incremental numbering (1, 2, …).
     """
-    if isinstance(target_date, datetime):
-        target_date = target_date.date()
-    date_iso = target_date.isoformat()
+    return record_link_batches(username, {target_date: links})
+
 
+def record_link_batches(username: str,
+                        batches: Dict[date | datetime, List[str]]) -> bool:
+    """
+    Record links for several dates with a single workbook load + save.
+    `batches` maps each date to the links recorded on it, in order.
+    """
     safe_username = _sanitize_filename(username)
     path = get_user_excel_path(safe_username)
     if not path:
@@ -87,22 +178,98 @@ def record_links(username: str, target_date: date | datetime,
             f"Excel for user '{username}' not found: expected {REPORTS_DIR}/{safe_username}.xlsx"
         )
 
+    import openpyxl
+
     wb = openpyxl.load_workbook(path)
     ws = wb.active
+    index = _load_index(wb, ws)
 
-    # Ensure column for this date exists
-    col_idx = _find_date_column(ws, date_iso)
-    if not col_idx:
-        col_idx = ws.max_column + 1
-        ws.cell(row=1, column=col_idx, value=date_iso)
-
-    # Find next empty row (from row 3 down)
-    start_row = 3
-    row = start_row
-    while ws.cell(row=row, column=col_idx).value not in (None, ""):
+    for target_date, links in batches.items():
+        if isinstance(target_date, datetime):
+            target_date = target_date.date()
+        _append_links(ws, index, target_date.isoformat(), links)
+
+    _save_index(wb, index)
+    wb.save(path)
+    return True
+
+
+def _scan_index(ws) -> Dict[str, list]:
+    """Build the index from the reply sheet (upgrade path for old workbooks)."""
+    index = {}
+    last_col = ws.max_column
+    for col in range(2, last_col + 1):
+        val = ws.cell(row=1, column=col).value
+        if val in (None, ""):
+            continue
+        index[str(val)] = [col, _scan_next_row(ws, col)]
+    index[NEXT_COLUMN_KEY] = [last_col + 1, None]
+    return index
+
+
+def _scan_next_row(ws, col: int) -> int:
+    row = FIRST_LINK_ROW
+    while ws.cell(row=row, column=col).value not in (None, ""):
         row += 1
+    return row
+
+
+def _load_index(wb, ws) -> Dict[str, list]:
+    """
+    Read the persisted index, or build it on first touch of a workbook that
+    predates it. A few O(1) spot checks catch manual edits in Excel; a
+    stale index is rebuilt from the sheet.
+    """
+    if INDEX_SHEET not in wb.sheetnames:
+        return _scan_index(ws)
+
+    index = {}
+    for key, col, next_row in wb[INDEX_SHEET].iter_rows(min_row=2,
+                                                        values_only=True):
+        if key is not None and col is not None:
+            index[str(key)] = [int(col), next_row]
 
-    existing_links = row - start_row
+    next_col = index.get(NEXT_COLUMN_KEY, [None])[0]
+    if not next_col or ws.cell(row=1, column=next_col).value not in (None,
+                                                                     ""):
+        return _scan_index(ws)
+    return index
+
+
+def _save_index(wb, index: Dict[str, list]):
+    if INDEX_SHEET in wb.sheetnames:
+        wb.remove(wb[INDEX_SHEET])
+    idx_ws = wb.create_sheet(INDEX_SHEET)
+    idx_ws.sheet_state = "hidden"
+    idx_ws.append(["date", "column", "next_row"])
+    for key, (col, next_row) in index.items():
+        idx_ws.append([key, col, next_row])
+
+
+def _append_links(ws, index: Dict[str, list], date_iso: str,
+                  links: List[str]):
+    from openpyxl.styles import Alignment
+
+    # Ensure column for this date exists
+    entry = index.get(date_iso)
+    if entry and ws.cell(row=1, column=entry[0]).value != date_iso:
+        entry = None  # column moved by a manual edit
+    if not entry:
+        col_idx = _find_date_column(ws, date_iso)
+        if col_idx:
+            entry = [col_idx, _scan_next_row(ws, col_idx)]
+        else:
+            col_idx = index[NEXT_COLUMN_KEY][0]
+            ws.cell(row=1, column=col_idx, value=date_iso)
+            index[NEXT_COLUMN_KEY][0] = col_idx + 1
+            entry = [col_idx, FIRST_LINK_ROW]
+        index[date_iso] = entry
+
+    col_idx, row = entry
+    if ws.cell(row=row, column=col_idx).value not in (None, ""):
+        row = _scan_next_row(ws, col_idx)  # rows filled by a manual edit
+
+    existing_links = row - FIRST_LINK_ROW
     idx = existing_links + 1
 
     # Write links
@@ -112,6 +279,4 @@ def record_links(username: str, target_date: date | datetime,
         cell.alignment = Alignment(horizontal="center")
         row += 1
         idx += 1
-
-    wb.save(path)
-    return True
+    entry[1] = row
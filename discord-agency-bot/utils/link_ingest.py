@@ -0,0 +1,107 @@
+"""
+Per-user link ingest queue.
+
+Paying a write per message hurts users who paste links in bursts.
+`LinkIngest` buffers link events per user and writes them in one job once
+`flush_seconds` have passed since the first buffered event, or as soon as
+`batch_size` events are waiting.
+
+`submit()` returns a future that resolves when the batch holding those
+events has been written, so callers can acknowledge only durable links.
+`on_written(user_id, items)` runs on the loop after each successful batch.
+"""
+
+import asyncio
+from typing import Any, Callable, Optional
+
+from utils.models import TrackedUser
+
+DEFAULT_FLUSH_SECONDS = 2.0
+DEFAULT_BATCH_SIZE = 50
+
+# writer(user_id, user, items) -- blocking, runs on the executor
+BatchWriter = Callable[[str, TrackedUser, list], None]
+
+
+class _Batch:
+    __slots__ = ("user", "items", "waiters", "timer")
+
+    def __init__(self):
+        self.user: Optional[TrackedUser] = None
+        self.items: list = []
+        self.waiters: list[asyncio.Future] = []
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class LinkIngest:
+
+    def __init__(self,
+                 workbooks,
+                 writer: BatchWriter,
+                 flush_seconds: float = DEFAULT_FLUSH_SECONDS,
+                 batch_size: int = DEFAULT_BATCH_SIZE,
+                 on_written: Optional[Callable[[str, list], Any]] = None):
+        self.workbooks = workbooks
+        self.writer = writer
+        self.on_written = on_written
+        self.flush_seconds = flush_seconds
+        self.batch_size = batch_size
+        self._batches: dict[str, _Batch] = {}
+        self._flushing: set[asyncio.Task] = set()
+
+    def submit(self, user_id: str, user: TrackedUser,
+               items: list) -> asyncio.Future:
+        """Queue `items` for `user_id`; the future resolves once written."""
+        loop = asyncio.get_running_loop()
+        batch = self._batches.get(user_id)
+        if batch is None:
+            batch = self._batches[user_id] = _Batch()
+            batch.timer = loop.call_later(self.flush_seconds, self._flush,
+                                          user_id)
+
+        batch.user = user
+        batch.items.extend(items)
+        waiter = loop.create_future()
+        batch.waiters.append(waiter)
+
+        if len(batch.items) >= self.batch_size:
+            self._flush(user_id)
+        return waiter
+
+    def _flush(self, user_id: str):
+        batch = self._batches.pop(user_id, None)
+        if batch is None:
+            return
+        if batch.timer is not None:
+            batch.timer.cancel()
+        task = asyncio.create_task(self._write(user_id, batch))
+        self._flushing.add(task)
+        task.add_done_callback(self._flushing.discard)
+
+    async def _write(self, user_id: str, batch: _Batch):
+        try:
+            # keyed apart from the user's workbook jobs so ingest never
+            # queues behind a slow report write
+            await self.workbooks.run(f"ingest:{user_id}", self.writer,
+                                     user_id, batch.user, batch.items)
+        except Exception as e:
+            for waiter in batch.waiters:
+                if not waiter.done():
+                    waiter.set_exception(e)
+            return
+
+        if self.on_written is not None:
+            try:
+                self.on_written(user_id, batch.items)
+            except Exception as e:
+                print(f"⚠️ LinkIngest on_written failed: {e}")
+        for waiter in batch.waiters:
+            if not waiter.done():
+                waiter.set_result(len(batch.items))
+
+    async def close(self):
+        """Write everything still buffered and wait for in-flight batches."""
+        for user_id in list(self._batches):
+            self._flush(user_id)
+        if self._flushing:
+            await asyncio.gather(*self._flushing, return_exceptions=True)
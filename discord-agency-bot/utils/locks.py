@@ -0,0 +1,185 @@
+"""
+Keyed locks shared by the event loop and worker threads.
+
+A user's workbook is touched from coroutines (archiving, uploads, /stop)
+and from executor jobs (materializing links, /getall reading it), and
+neither asyncio.Lock nor threading.Lock alone covers both sides. A
+`HybridLock` can be taken with `async with` on the loop or `with` in a
+thread, and waiters of both kinds are served in arrival order.
+
+`LockManager` (bot.locks) hands them out per key:
+    async with bot.locks.user(user_id):   # on the loop
+        ...
+    with bot.locks.user(user_id):         # in a worker thread
+        ...
+Entries are dropped once nobody holds or waits on them.
+
+`bot.locks.storage` is the storage-wide writer lock: Storage serializes
+every mutation and backend write on it. It is a plain RLock, held only
+for in-memory work, so take it with `with` and never await inside.
+
+Locks are not reentrant: a coroutine holding `user(uid)` must not call
+something that takes it again (e.g. bot.workbooks.run(uid, ...)).
+"""
+
+import asyncio
+import threading
+from collections import deque
+from typing import Dict, List
+
+
+class HybridLock:
+
+    def __init__(self):
+        self._mutex = threading.Lock()
+        self._locked = False
+        # threading.Event for thread waiters, (loop, future) for coroutines
+        self._waiters: deque = deque()
+
+    def locked(self) -> bool:
+        return self._locked
+
+    # ---- Threads ----
+    def acquire(self):
+        with self._mutex:
+            if not self._locked:
+                self._locked = True
+                return
+            event = threading.Event()
+            self._waiters.append(event)
+        event.wait()  # ownership is handed over by release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    # ---- Coroutines ----
+    async def acquire_async(self):
+        loop = asyncio.get_running_loop()
+        with self._mutex:
+            if not self._locked:
+                self._locked = True
+                return
+            waiter = (loop, loop.create_future())
+            self._waiters.append(waiter)
+        try:
+            await waiter[1]
+        except asyncio.CancelledError:
+            with self._mutex:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                    raise
+            if waiter[1].done() and not waiter[1].cancelled():
+                self.release()  # handed over just as we were cancelled
+            raise
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+    # ---- Both ----
+    def release(self):
+        with self._mutex:
+            if not self._waiters:
+                self._locked = False
+                return
+            waiter = self._waiters.popleft()
+        # the lock stays held: ownership passes straight to the next waiter
+        if isinstance(waiter, threading.Event):
+            waiter.set()
+        else:
+            loop, future = waiter
+            loop.call_soon_threadsafe(self._hand_over, future)
+
+    def _hand_over(self, future: asyncio.Future):
+        if future.cancelled():
+            self.release()  # that waiter gave up; pass it on
+        else:
+            future.set_result(None)
+
+
+class _KeyGuard:
+    """Context manager for one key: `with` in threads, `async with` on the loop."""
+
+    __slots__ = ("_manager", "_key", "_lock")
+
+    def __init__(self, manager: "LockManager", key: str):
+        self._manager = manager
+        self._key = key
+        self._lock = None
+
+    def acquire(self):
+        self._lock = self._manager._ref(self._key)
+        try:
+            self._lock.acquire()
+        except BaseException:
+            self._manager._unref(self._key)
+            raise
+
+    async def acquire_async(self):
+        self._lock = self._manager._ref(self._key)
+        try:
+            await self._lock.acquire_async()
+        except BaseException:
+            self._manager._unref(self._key)
+            raise
+
+    def release(self):
+        """Release from any thread or callback, not only the acquirer's."""
+        self._lock.release()
+        self._manager._unref(self._key)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+    async def __aenter__(self):
+        await self.acquire_async()
+        return self
+
+    async def __aexit__(self, *exc):
+        self.release()
+
+
+class LockManager:
+
+    def __init__(self):
+        self.storage = threading.RLock()
+        self._mutex = threading.Lock()
+        # key -> [lock, number of holders and waiters]
+        self._locks: Dict[str, List] = {}
+
+    def key(self, key: str) -> _KeyGuard:
+        """Guard for an arbitrary key (e.g. "ingest:<user_id>")."""
+        return _KeyGuard(self, str(key))
+
+    def user(self, user_id) -> _KeyGuard:
+        """Guard for everything that reads or rewrites one user's workbook."""
+        return _KeyGuard(self, str(user_id))
+
+    def _ref(self, key: str) -> HybridLock:
+        with self._mutex:
+            entry = self._locks.get(key)
+            if entry is None:
+                entry = self._locks[key] = [HybridLock(), 0]
+            entry[1] += 1
+            return entry[0]
+
+    def _unref(self, key: str):
+        with self._mutex:
+            entry = self._locks[key]
+            entry[1] -= 1
+            if entry[1] == 0:
+                del self._locks[key]
+
+    def __len__(self) -> int:
+        return len(self._locks)
@@ -0,0 +1,267 @@
+"""
+Event-loop blocking watchdog.
+
+Blocking work inside a coroutine (an openpyxl load, a big json.dump, a
+file copy) holds the event loop: no other message, command or gateway
+heartbeat runs until it returns, and Discord drops the connection if
+that lasts too long.
+
+`LoopWatchdog` keeps a heartbeat callback ticking on the loop and a
+thread watching it. When the heartbeat is more than `threshold` late, the
+thread grabs the loop thread's current Python stack, i.e. the code that
+is blocking it right now. Once the loop recovers the stall is recorded,
+attributed to the cog and command/listener found on that stack (or the
+asyncio task name), and printed. Findings are grouped by (cog, command,
+blocking line) and posted to the admin channel as one summary every
+`summary_seconds`, worst stack attached.
+
+    bot.watchdog = LoopWatchdog(bot, threshold=0.25)
+    bot.watchdog.start()   # on the loop
+    ...
+    await bot.watchdog.close()   # before bot.admin_log.close()
+"""
+
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import discord
+
+from utils.metrics import METRICS
+
+DEFAULT_THRESHOLD = 0.25  # seconds the loop may be held before it counts
+DEFAULT_SUMMARY_SECONDS = 600.0
+STACK_DEPTH = 12  # innermost frames kept per finding
+MAX_SUMMARY_LINES = 10
+
+BOT_DIR = Path(__file__).resolve().parent.parent
+
+
+class _Finding:
+    __slots__ = ("count", "total", "max", "stack")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.stack = ""
+
+
+class LoopWatchdog:
+
+    def __init__(self,
+                 bot,
+                 threshold: float = DEFAULT_THRESHOLD,
+                 summary_seconds: float = DEFAULT_SUMMARY_SECONDS):
+        self.bot = bot
+        self.threshold = threshold
+        self.summary_seconds = summary_seconds
+        # heartbeat period: a stall is noticed within half a threshold
+        self.interval = min(threshold / 2, 0.1)
+
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread = 0
+        self._beat = 0.0  # monotonic time of the last heartbeat
+        self._handle: Optional[asyncio.TimerHandle] = None
+        # (beat it belongs to, frame codes innermost first, stack text,
+        #  blocking line, task name)
+        self._captured: Optional[tuple] = None
+
+        self._findings: Dict[Tuple[str, str, str], _Finding] = {}
+        self._owners: Dict[object, Tuple[str, str]] = {}  # code -> (cog, label)
+        self._cog_count = -1
+        self._summary_task: Optional[asyncio.Task] = None
+
+    # ---- Lifecycle ----
+    def start(self):
+        if self._thread is not None or self.threshold <= 0:
+            return
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._beat = time.monotonic()
+        self._handle = self._loop.call_later(self.interval, self._on_beat)
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._watch,
+                                        name="loop-watchdog",
+                                        daemon=True)
+        self._thread.start()
+        self._summary_task = asyncio.create_task(self._run_summaries())
+
+    async def close(self):
+        self._stopped.set()
+        if self._handle is not None:
+            self._handle.cancel()
+            self._handle = None
+        if self._summary_task is not None:
+            self._summary_task.cancel()
+            self._summary_task = None
+        if self._thread is not None:
+            await asyncio.to_thread(self._thread.join, 1.0)
+            self._thread = None
+        self.post_summary()  # findings since the last one
+
+    def set_threshold(self, threshold: float):
+        """Apply a new threshold while running (on a config reload)."""
+        self.threshold = threshold
+        if threshold > 0:
+            self.interval = min(threshold / 2, 0.1)
+            if self._thread is None:
+                self.start()
+
+    # ---- Loop side ----
+    def _on_beat(self):
+        now = time.monotonic()
+        late = now - self._beat - self.interval
+        with self._lock:
+            captured, self._captured = self._captured, None
+            beat, self._beat = self._beat, now
+        if late >= self.threshold and captured and captured[0] == beat:
+            self._record(late, *captured[1:])
+        self._handle = self._loop.call_later(self.interval, self._on_beat)
+
+    def _record(self, seconds: float, codes, stack: str, where: str,
+                task_name: str):
+        cog, command = self._attribute(codes, task_name)
+        METRICS.inc("loop.blocked")
+        METRICS.observe("loop.block", seconds)
+        print(f"🐢 Event loop blocked {seconds:.2f}s in {cog} {command} "
+              f"({where})")
+
+        finding = self._findings.get((cog, command, where))
+        if finding is None:
+            finding = self._findings[(cog, command, where)] = _Finding()
+        finding.count += 1
+        finding.total += seconds
+        if seconds >= finding.max:
+            finding.max = seconds
+            finding.stack = stack
+
+    def _attribute(self, codes, task_name: str) -> Tuple[str, str]:
+        """(cog, command or listener) owning a captured stack."""
+        if len(self.bot.cogs) != self._cog_count:
+            self._index_cogs()
+        cog, command = None, None
+        for code in codes:  # innermost first
+            owner = self._owners.get(code)
+            if owner is None:
+                continue
+            if cog is None:
+                cog, command = owner  # nearest cog method
+            if owner[1].startswith(("/", "!", "on ")):
+                cog, command = owner  # the command or listener running it
+                break
+        return cog or "-", command or f"task {task_name}"
+
+    def _index_cogs(self):
+        """Map cog function code objects to (cog, command/listener label)."""
+        owners = {}
+        for cog_name, cog in self.bot.cogs.items():
+            for value in vars(type(cog)).values():
+                fn = getattr(value, "callback", value)
+                code = getattr(fn, "__code__", None)
+                if code is not None:
+                    owners[code] = (cog_name, fn.__name__)
+            for cmd in cog.walk_app_commands():
+                owners[cmd.callback.__code__] = (cog_name,
+                                                 f"/{cmd.qualified_name}")
+            for cmd in cog.walk_commands():
+                owners[cmd.callback.__code__] = (cog_name,
+                                                 f"!{cmd.qualified_name}")
+            for event, method in cog.get_listeners():
+                owners[method.__func__.__code__] = (cog_name, f"on {event}")
+        self._owners = owners
+        self._cog_count = len(self.bot.cogs)
+
+    # ---- Watchdog thread ----
+    def _watch(self):
+        while not self._stopped.wait(self.interval / 2):
+            if self.threshold <= 0:  # switched off by a reload
+                continue
+            with self._lock:
+                beat = self._beat
+                if (self._captured is not None or
+                        time.monotonic() - beat - self.interval <
+                        self.threshold):
+                    continue
+            frame = sys._current_frames().get(self._loop_thread)
+            if frame is None:
+                continue
+            codes = []
+            f = frame
+            while f is not None:
+                codes.append(f.f_code)
+                f = f.f_back
+            frames = traceback.extract_stack(frame)
+            stack = "".join(traceback.format_list(frames[-STACK_DEPTH:]))
+            where = _blocking_line(frames)
+            try:
+                task = asyncio.current_task(self._loop)
+                task_name = task.get_name() if task else "-"
+            except Exception:
+                task_name = "-"
+            del frame, f
+            with self._lock:
+                if self._beat == beat:  # still the same stall
+                    self._captured = (beat, codes, stack, where, task_name)
+
+    # ---- Summaries ----
+    async def _run_summaries(self):
+        while True:
+            await asyncio.sleep(self.summary_seconds)
+            try:
+                self.post_summary()
+            except Exception as e:
+                print(f"⚠️ Loop watchdog summary failed: {e}")
+
+    def post_summary(self):
+        """Queue a summary of findings since the last one on the admin log."""
+        findings, self._findings = self._findings, {}
+        if not findings:
+            return
+        ranked = sorted(findings.items(),
+                        key=lambda kv: kv[1].total,
+                        reverse=True)
+        stalls = sum(f.count for f in findings.values())
+        worst = max(f.max for f in findings.values())
+        lines = [
+            f"🐢 Event loop blocked **{stalls}** time(s) in the last "
+            f"{int(self.summary_seconds)}s (threshold "
+            f"{int(self.threshold * 1000)} ms, worst {worst:.2f}s):"
+        ]
+        for (cog, command, where), f in ranked[:MAX_SUMMARY_LINES]:
+            lines.append(f"• {f.count}× max {f.max:.2f}s — {cog} {command} "
+                         f"— `{where}`")
+        if len(ranked) > MAX_SUMMARY_LINES:
+            lines.append(f"…and {len(ranked) - MAX_SUMMARY_LINES} more")
+
+        (cog, command, _), top = ranked[0]
+        embed = discord.Embed(title=f"🐢 Slowest stall: {cog} {command}",
+                              description=f"```\n{top.stack[-3900:]}\n```",
+                              color=discord.Color.orange())
+        self.bot.admin_log.log("\n".join(lines), logging.WARNING)
+        self.bot.admin_log.log(f"🐢 stack: {cog} {command}",
+                               logging.WARNING,
+                               embed=embed)
+
+
+def _blocking_line(frames: traceback.StackSummary) -> str:
+    """Innermost frame in the bot's own code, e.g. 'utils/x.py:9 in f'."""
+    for fs in reversed(frames):
+        try:
+            path = Path(fs.filename).resolve().relative_to(BOT_DIR)
+        except ValueError:
+            continue
+        if path.parts[0] not in ("venv", ".venv"):
+            return f"{path}:{fs.lineno} in {fs.name}"
+    if not frames:
+        return "?"
+    fs = frames[-1]
+    return f"{Path(fs.filename).name}:{fs.lineno} in {fs.name}"
@@ -0,0 +1,275 @@
+"""
+In-process metrics.
+
+A small registry of counters, timers (histograms of seconds) and gauges
+for the hot paths: message dispatch, link ingest, storage loads and
+writes, workbook jobs, report refreshes, /dashboard and cleanup sweeps.
+An event-loop lag sampler records how late a periodic wake-up fires,
+which is the time the loop spent blocked on something else.
+
+The registry is module-global (`METRICS`, also `bot.metrics`) so utils
+that never see the bot can report too:
+
+    with METRICS.timer("storage.write"):
+        ...
+    METRICS.inc("links.recorded", len(events))
+
+    @timed("reports.sync")
+    async def _sync(...): ...
+
+Figures are read through `/botstats` or, when METRICS_PORT is set, a local
+HTTP endpoint (`/metrics` in Prometheus text format, `/metrics.json`).
+
+With METRICS_ENABLED off every call returns after one attribute check;
+`timer()` hands back a shared no-op context manager.
+"""
+
+import asyncio
+import bisect
+import functools
+import json
+import threading
+import time
+from typing import Callable, Dict, Optional
+
+# Upper bounds (seconds) of the timer histogram buckets
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+DEFAULT_LAG_INTERVAL = 1.0
+DEFAULT_HOST = "127.0.0.1"
+PROMETHEUS_PREFIX = "replyguy_"
+
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "count", "sum", "max")
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # last one is +Inf
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+
+    def quantile(self, q: float) -> float:
+        """Estimate: upper bound of the bucket holding the q-th value."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= target:
+                bound = self.buckets[i] if i < len(self.buckets) else self.max
+                return min(bound, self.max)
+        return self.max
+
+    def summary(self) -> dict:
+        return {
+            "count": self.count,
+            "sum": self.sum,
+            "mean": self.sum / self.count if self.count else 0.0,
+            "p50": self.quantile(0.5),
+            "p99": self.quantile(0.99),
+            "max": self.max,
+        }
+
+
+class _Timer:
+    __slots__ = ("_metrics", "_name", "_start")
+
+    def __init__(self, metrics: "Metrics", name: str):
+        self._metrics = metrics
+        self._name = name
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self._metrics.observe(self._name, time.perf_counter() - self._start)
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        pass
+
+
+_NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+
+    def __init__(self, enabled: bool = True):
+        self.enabled = enabled
+        self.started = time.time()
+        self._lock = threading.Lock()
+        self._counters: Dict[str, int] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._gauges: Dict[str, Callable[[], float]] = {}
+        self._lag_task: Optional[asyncio.Task] = None
+        self._runner = None  # aiohttp AppRunner while the endpoint is up
+
+    # ---- Recording (any thread) ----
+    def inc(self, name: str, n: int = 1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def observe(self, name: str, seconds: float):
+        if not self.enabled:
+            return
+        with self._lock:
+            hist = self._histograms.get(name)
+            if hist is None:
+                hist = self._histograms[name] = Histogram()
+            hist.observe(seconds)
+
+    def timer(self, name: str):
+        """Context manager timing its block into histogram `name`."""
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def gauge(self, name: str, fn: Callable[[], float]):
+        """Register a value read only when stats are rendered."""
+        self._gauges[name] = fn
+
+    # ---- Reading ----
+    def snapshot(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            timers = {
+                name: hist.summary()
+                for name, hist in self._histograms.items()
+            }
+        gauges = {}
+        for name, fn in list(self._gauges.items()):
+            try:
+                gauges[name] = fn()
+            except Exception:
+                continue
+        return {
+            "enabled": self.enabled,
+            "uptime_seconds": round(time.time() - self.started, 1),
+            "counters": counters,
+            "gauges": gauges,
+            "timers": timers,
+        }
+
+    def render_prometheus(self) -> str:
+        lines = []
+        with self._lock:
+            counters = sorted(self._counters.items())
+            hists = [(name, list(h.counts), h.sum, h.count, h.buckets)
+                     for name, h in sorted(self._histograms.items())]
+        for name, value in counters:
+            metric = _prom_name(name) + "_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {value}"]
+        for name, value in sorted(self.snapshot()["gauges"].items()):
+            metric = _prom_name(name)
+            lines += [f"# TYPE {metric} gauge", f"{metric} {value}"]
+        for name, counts, total, count, buckets in hists:
+            metric = _prom_name(name) + "_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            cumulative = 0
+            for bound, n in zip(buckets + (float("inf"), ), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                lines.append(f'{metric}_bucket{{le="{le}"}} {cumulative}')
+            lines += [f"{metric}_sum {total}", f"{metric}_count {count}"]
+        return "\n".join(lines) + "\n"
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+        self.started = time.time()
+
+    # ---- Event-loop lag ----
+    def start_lag_sampler(self, interval: float = DEFAULT_LAG_INTERVAL):
+        if self.enabled and self._lag_task is None:
+            self._lag_task = asyncio.create_task(self._sample_lag(interval))
+
+    async def _sample_lag(self, interval: float):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + interval
+            await asyncio.sleep(interval)
+            self.observe("loop.lag", max(0.0, loop.time() - expected))
+
+    # ---- HTTP endpoint ----
+    async def serve(self, port: int, host: str = DEFAULT_HOST):
+        """Expose /metrics (Prometheus text) and /metrics.json locally."""
+        from aiohttp import web
+
+        async def prometheus(request):
+            return web.Response(text=self.render_prometheus(),
+                                content_type="text/plain")
+
+        async def as_json(request):
+            return web.Response(text=json.dumps(self.snapshot()),
+                                content_type="application/json")
+
+        app = web.Application()
+        app.router.add_get("/metrics", prometheus)
+        app.router.add_get("/metrics.json", as_json)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        await web.TCPSite(self._runner, host, port).start()
+        print(f"📈 Metrics endpoint on http://{host}:{port}/metrics")
+
+    async def close(self):
+        if self._lag_task is not None:
+            self._lag_task.cancel()
+            self._lag_task = None
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+
+def _prom_name(name: str) -> str:
+    return PROMETHEUS_PREFIX + "".join(c if c.isalnum() else "_"
+                                       for c in name)
+
+
+METRICS = Metrics()
+
+
+def timed(name: str):
+    """Decorator timing every call (sync or async) into `name`."""
+
+    def decorator(fn):
+        if asyncio.iscoroutinefunction(fn):
+
+            @functools.wraps(fn)
+            async def async_wrapper(*args, **kwargs):
+                if not METRICS.enabled:
+                    return await fn(*args, **kwargs)
+                with _Timer(METRICS, name):
+                    return await fn(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not METRICS.enabled:
+                return fn(*args, **kwargs)
+            with _Timer(METRICS, name):
+                return fn(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
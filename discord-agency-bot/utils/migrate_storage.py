@@ -0,0 +1,56 @@
+"""
+Import the JSON/journal roster (data/users.json plus any pending journal)
+into the SQLite backend.
+
+Usage (from the bot directory):
+    python -m utils.migrate_storage [--source data/users.json] [--dest data/users.db] [--force]
+
+Then set "STORAGE_BACKEND": "sqlite" in config.json and restart the bot.
+The bot also imports the roster by itself when it starts on an empty
+users.db; this tool does it ahead of time, with verification.
+"""
+
+import argparse
+from pathlib import Path
+
+from utils.storage_backends import SqliteBackend, read_roster
+from utils.storage_utils import DEFAULT_PATH
+
+
+def migrate(source: Path, dest: Path, force: bool = False) -> int:
+    data = read_roster(source)
+    backend = SqliteBackend(dest)
+    try:
+        existing = backend.load()
+        if existing and not force:
+            raise SystemExit(
+                f"❌ {dest} already holds {len(existing)} user(s); "
+                f"use --force to overwrite.")
+        backend.replace(data)
+        imported = backend.load()
+    finally:
+        backend.close()
+
+    if imported.keys() != data.keys():
+        raise SystemExit("❌ Verification failed: user ids differ from source.")
+    return len(imported)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Import users.json into the SQLite storage backend")
+    parser.add_argument("--source", type=Path, default=DEFAULT_PATH)
+    parser.add_argument("--dest",
+                        type=Path,
+                        default=DEFAULT_PATH.with_suffix(".db"))
+    parser.add_argument("--force",
+                        action="store_true",
+                        help="overwrite a non-empty database")
+    args = parser.parse_args()
+
+    count = migrate(args.source, args.dest, force=args.force)
+    print(f"✅ Imported {count} user(s) from {args.source} into {args.dest}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,140 @@
+"""
+Roster record.
+
+Storage used to hand out a fresh dict (or a 6-tuple of strings) on every
+read, and each cog re-parsed ids, dates and targets from it. `TrackedUser`
+is parsed once, when the roster is loaded or a user changes, and the same
+instance is then shared by every reader: ids are ints, `start_date` is a
+`date` and `status` a `UserStatus`.
+
+Records are read-only; Storage swaps in a new one (see `replace()`) on
+every change, so a record held by a cog is a consistent snapshot. On disk
+the roster keeps its original string shape (`from_dict()` / `to_dict()`).
+"""
+
+from datetime import date, datetime
+from enum import Enum
+from typing import Optional
+
+
+class UserStatus(str, Enum):
+    PENDING = "pending"
+    ACTIVE = "active"
+    PAUSED = "paused"
+
+    @classmethod
+    def parse(cls, value) -> "UserStatus":
+        try:
+            return cls(value)
+        except ValueError:
+            return cls.PENDING
+
+    def __str__(self) -> str:
+        return self.value
+
+
+def _parse_id(value) -> Optional[int]:
+    try:
+        return int(value or 0) or None
+    except (TypeError, ValueError):
+        return None
+
+
+def _parse_date(value) -> date:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    try:
+        return datetime.strptime(str(value), "%Y-%m-%d").date()
+    except (TypeError, ValueError):
+        return datetime.utcnow().date()
+
+
+class TrackedUser:
+
+    __slots__ = ("user_id", "channel_id", "username", "replies_per_day",
+                 "start_date", "status", "extra")
+
+    # persisted keys; anything else in a stored record is kept in `extra`
+    FIELDS = ("channel_id", "username", "replies_per_day", "start_date",
+              "status")
+
+    def __init__(self,
+                 user_id,
+                 channel_id=None,
+                 username: Optional[str] = None,
+                 replies_per_day=0,
+                 start_date=None,
+                 status=UserStatus.PENDING,
+                 extra: Optional[dict] = None):
+        user_id = int(user_id)
+        set_ = object.__setattr__
+        set_(self, "user_id", user_id)
+        set_(self, "channel_id", _parse_id(channel_id))
+        set_(self, "username", str(username or f"user_{user_id}"))
+        set_(self, "replies_per_day", int(replies_per_day or 0))
+        set_(self, "start_date", _parse_date(start_date))
+        set_(self, "status", UserStatus.parse(status))
+        set_(self, "extra", extra or None)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("TrackedUser is read-only; use replace()")
+
+    __delattr__ = __setattr__
+
+    # ---- Conversion ----
+    @classmethod
+    def from_dict(cls, user_id, data: dict) -> "TrackedUser":
+        extra = {k: v for k, v in data.items() if k not in cls.FIELDS}
+        return cls(user_id, data.get("channel_id"), data.get("username"),
+                   data.get("replies_per_day"), data.get("start_date"),
+                   data.get("status"), extra)
+
+    def to_dict(self) -> dict:
+        """The persisted (JSON) shape of the record."""
+        out = {
+            "channel_id": str(self.channel_id or ""),
+            "username": self.username,
+            "replies_per_day": self.replies_per_day,
+            "start_date": self.start_date.isoformat(),
+            "status": self.status.value,
+        }
+        if self.extra:
+            out.update(self.extra)
+        return out
+
+    def replace(self, **changes) -> "TrackedUser":
+        """A copy with `changes` applied; unknown keys go to `extra`."""
+        fields = {name: getattr(self, name) for name in self.__slots__}
+        extra = dict(self.extra or {})
+        for key, value in changes.items():
+            if key in fields and key != "extra":
+                fields[key] = value
+            else:
+                extra[key] = value
+        fields["extra"] = extra
+        return TrackedUser(**fields)
+
+    # ---- Helpers ----
+    @property
+    def key(self) -> str:
+        """The user id as a string, the key used by storage and the logs."""
+        return str(self.user_id)
+
+    def _values(self) -> tuple:
+        return tuple(getattr(self, name) for name in self.__slots__)
+
+    def __eq__(self, other):
+        if not isinstance(other, TrackedUser):
+            return NotImplemented
+        return self._values() == other._values()
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return (f"TrackedUser(user_id={self.user_id}, "
+                f"channel_id={self.channel_id}, username={self.username!r}, "
+                f"replies_per_day={self.replies_per_day}, "
+                f"start_date={self.start_date.isoformat()}, "
+                f"status={self.status.value})")
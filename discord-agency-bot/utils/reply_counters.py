@@ -0,0 +1,188 @@
+"""
+Running reply counters.
+
+Per-user totals and per-day counts, persisted to data/counters.json with
+the same debounced write-behind as users.json. /dashboard reads these
+instead of opening workbooks.
+
+A user's counts are their `base` (links recorded in the workbook before
+the event log existed, seeded once from it) plus their current-tenure
+events in the log. Appends are counted as they become durable (an event
+store listener); the startup scan and /rebuildcounters recount the log
+the same way through ReportViews (`begin_recount()` / `finish_recount()`),
+so both agree and a crash can't leave /dashboard behind the log.
+
+Data shape:
+{
+  "user_id": {"total": int, "days": {"YYYY-MM-DD": int, ...},
+              "base": {"YYYY-MM-DD": int, ...}},
+  ...
+}
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+from utils.event_store import LinkEvent, LinkEventStore
+from utils.storage_backends import JsonBackend
+
+DEFAULT_COUNTERS_PATH = Path("data/counters.json")
+
+
+def _entry(days: Dict[str, int], base: Dict[str, int]) -> dict:
+    return {"total": sum(days.values()), "days": days, "base": base}
+
+
+class ReplyCounters:
+
+    def __init__(self,
+                 storage,
+                 events: LinkEventStore,
+                 path: str | Path = DEFAULT_COUNTERS_PATH):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage = storage
+        self._lock = threading.Lock()
+        self._backend = JsonBackend(self.path)
+        self._data: Dict[str, dict] = self._backend.load()
+        # log offset the counts include; appends seen during a recount
+        self._offset = events.end_offset()
+        self._captured: Optional[List[LinkEvent]] = None
+        self._reset: Set[str] = set()
+        self._backend.attach(self._snapshot)
+        events.subscribe(self._on_append)
+        storage.subscribe(self._on_storage_change)
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            return {
+                uid: dict(c, days=dict(c["days"]))
+                for uid, c in self._data.items()
+            }
+
+    def _on_storage_change(self, user_id: str, before, after):
+        with self._lock:
+            if after is None:
+                self._data.pop(user_id, None)
+            elif before is None:
+                # (re)added: a new tenure starts from zero
+                self._data[user_id] = _entry({}, {})
+                if self._captured is not None:
+                    self._reset.add(user_id)
+            else:
+                return
+        self._backend.record([])
+
+    # ---- Updates ----
+    def _count(self, events: Iterable) -> bool:
+        # caller holds self._lock; events of users no longer set up are
+        # dropped rather than recreating their entry
+        counted = False
+        for ev in events:
+            if self.storage.get_user(ev.user_id) is None:
+                continue
+            entry = self._data.setdefault(ev.user_id, _entry({}, {}))
+            days = entry["days"]
+            days[ev.date] = days.get(ev.date, 0) + 1
+            entry["total"] += 1
+            counted = True
+        return counted
+
+    def _on_append(self, events: List[LinkEvent], end_offset: int):
+        # runs on the executor under the event log's append lock
+        with self._lock:
+            self._offset = end_offset
+            if self._captured is not None:
+                self._captured.extend(events)
+            counted = self._count(events)
+        if counted:
+            self._backend.record([])
+
+    def add(self, user_id: str, events: Iterable):
+        """Count link events (anything with a `.date` YYYY-MM-DD string)."""
+        with self._lock:
+            counted = self._count(events)
+        if counted:
+            self._backend.record([])
+
+    # ---- Recount (ReportViews scans the log) ----
+    def needs_base(self, user_ids: Iterable[str]) -> List[str]:
+        """The users whose pre-log workbook links were never counted."""
+        with self._lock:
+            return [
+                uid for uid in user_ids
+                if "base" not in self._data.get(uid, {})
+            ]
+
+    def begin_recount(self) -> int:
+        """
+        Start a recount; returns the log offset to scan up to. Appends after
+        it are counted live and replayed by `finish_recount()`.
+        """
+        with self._lock:
+            self._captured = []
+            self._reset = set()
+            return self._offset
+
+    def cancel_recount(self):
+        with self._lock:
+            self._captured = None
+            self._reset = set()
+
+    def finish_recount(self, counts: Dict[str, Dict[str, int]],
+                       bases: Dict[str, Dict[str, int]]) -> int:
+        """
+        Replace the counts with base + `counts` (tenure events up to the
+        offset `begin_recount()` returned), `bases` seeding the users that
+        lack one; returns how many users' counts changed.
+        """
+        tracked = {user.key for user in self.storage.list_users()}
+        with self._lock:
+            captured, self._captured = self._captured or [], None
+            reset, self._reset = self._reset, set()
+            for ev in captured:
+                days = counts.setdefault(ev.user_id, {})
+                days[ev.date] = days.get(ev.date, 0) + 1
+            fresh = {}
+            for uid in tracked:
+                old = self._data.get(uid)
+                base = bases.get(uid, (old or {}).get("base"))
+                if uid in reset or base is None:
+                    # re-added meanwhile, or never seeded: leave as is
+                    if old is not None:
+                        fresh[uid] = old
+                    continue
+                days = dict(base)
+                for day, n in counts.get(uid, {}).items():
+                    days[day] = days.get(day, 0) + n
+                fresh[uid] = _entry(days, dict(base))
+            corrected = sum(
+                1 for uid in fresh.keys() | self._data.keys()
+                if (fresh.get(uid) or {}).get("days") !=
+                (self._data.get(uid) or {}).get("days"))
+            changed = fresh != self._data
+            self._data = fresh
+        if changed:
+            self._backend.record([])
+        return corrected
+
+    # ---- Reads ----
+    def total(self, user_id: str) -> int:
+        entry = self._data.get(user_id)
+        return entry["total"] if entry else 0
+
+    def on_day(self, user_id: str, day: str) -> int:
+        entry = self._data.get(user_id)
+        return entry["days"].get(day, 0) if entry else 0
+
+    def user_days(self, user_id: str) -> Optional[Dict[str, int]]:
+        entry = self._data.get(user_id)
+        return dict(entry["days"]) if entry else None
+
+    # ---- Persistence ----
+    def flush(self):
+        self._backend.flush()
+
+    def close(self):
+        self._backend.close()
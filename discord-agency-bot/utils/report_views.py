@@ -0,0 +1,349 @@
+"""
+Per-user workbooks as a materialized view of the link event store.
+
+Ingest only appends events; the workbook in data/reports is brought up to
+date afterwards, either lazily (`refresh_seconds` after new events arrive)
+or on demand when something is about to read it (`refresh()` before
+/myreport, /stop, /getall, archiving...). Events already applied to each
+workbook are tracked as a per-user count in data/events/views.json, so
+events that were durable but not yet materialized when the bot stopped are
+picked up on the next start.
+
+A user id can be removed and set up again; the log keeps the events of
+the earlier tenure. views.json also records, per user, how many of their
+events precede the current tenure, and a rebuild replays only the ones
+after it, in line with the reset reply counters and dedupe set.
+
+The startup scan also recounts the reply counters (bot.counters) from
+each tracked user's current-tenure events, which are only saved on a
+debounce; /rebuildcounters runs the same recount (`recount_counters()`).
+Links a workbook holds from before the event log are counted once into
+the user's counter base.
+"""
+
+import asyncio
+import threading
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from utils import excel_utils
+from utils.event_store import LinkEvent, LinkEventStore
+from utils.metrics import timed
+from utils.models import TrackedUser
+from utils.storage_backends import read_snapshot, write_snapshot
+
+DEFAULT_VIEWS_PATH = Path("data/events/views.json")
+DEFAULT_REFRESH_SECONDS = 60.0
+
+
+def _materialize(user_id: str, user: TrackedUser, events: List[LinkEvent],
+                 reset: bool) -> Path:
+    """Blocking: (re)create the user's workbook if needed and append `events`."""
+    safe_username = excel_utils._sanitize_filename(user.username)
+    path = excel_utils.REPORTS_DIR / f"{safe_username}.xlsx"
+
+    if reset or not path.exists():
+        start_date = user.start_date if reset else datetime.utcnow().date()
+        end_date = start_date + timedelta(days=60)
+        excel_utils.create_user_excel(user_id, safe_username, start_date,
+                                      end_date, user.replies_per_day)
+
+    batches: Dict[date, List[str]] = defaultdict(list)
+    for ev in events:
+        batches[datetime.strptime(ev.date, "%Y-%m-%d").date()].append(ev.url)
+    if batches:
+        excel_utils.record_link_batches(safe_username, batches)
+    return path
+
+
+class ReportViews:
+
+    def __init__(self,
+                 storage,
+                 events: LinkEventStore,
+                 workbooks,
+                 state_path: str | Path = DEFAULT_VIEWS_PATH,
+                 refresh_seconds: float = DEFAULT_REFRESH_SECONDS,
+                 counters=None):
+        self.storage = storage
+        self.events = events
+        self.workbooks = workbooks
+        self.counters = counters
+        self.state_path = Path(state_path)
+        self.refresh_seconds = refresh_seconds
+
+        self._applied: Dict[str, int] = {}
+        # user id -> count of their events from before the current tenure
+        self._starts: Dict[str, int] = {}
+        # user id -> times set up since startup; a sync that started in an
+        # earlier tenure must not touch the current one's bookkeeping
+        self._tenures: Dict[str, int] = defaultdict(int)
+        self._pending: Dict[str, List[LinkEvent]] = {}
+        self._timers: Dict[str, asyncio.TimerHandle] = {}
+        self._locks: Dict[str, asyncio.Lock] = defaultdict(asyncio.Lock)
+        self._tasks: set[asyncio.Task] = set()
+        # views.json writes from several syncs: the newest state wins
+        self._state_lock = threading.Lock()
+        self._state_version = 0
+        self._saved_version = 0
+
+        storage.subscribe(self._on_storage_change)
+
+    # ---- Startup / shutdown ----
+    def load(self):
+        """
+        Blocking: find events not yet in their workbook and recount the
+        reply counters (one log scan).
+        """
+        self._applied, self._starts = {}, {}
+        for uid, value in read_snapshot(self.state_path).items():
+            # [tenure start, applied]; older files hold the applied count
+            start, applied = value if isinstance(value, list) else (0, value)
+            self._applied[uid] = int(applied)
+            if start:
+                self._starts[uid] = int(start)
+        tracked = {user.key for user in self.storage.list_users()}
+        end = (self.counters.begin_recount()
+               if self.counters is not None else None)
+        pending, counts, applied_days = self._scan(end, tracked,
+                                                   self._starts,
+                                                   self._applied)
+        # events of users removed while the bot was down were archived
+        self._pending = {
+            uid: events
+            for uid, events in pending.items() if uid in tracked
+        }
+        if self.counters is not None:
+            bases = self._seed_bases(
+                self.counters.needs_base(tracked), applied_days)
+            corrected = self.counters.finish_recount(counts, bases)
+            if corrected:
+                print(f"🔢 Reply counters caught up from the event log "
+                      f"({corrected} user(s) corrected)")
+
+    def _scan(self, end: Optional[int], tracked: set, starts: Dict[str, int],
+              applied: Dict[str, int]) -> tuple:
+        """
+        Blocking: one pass over the log up to offset `end` -> (events not
+        yet applied, per user; tracked users' tenure events per day; the
+        same restricted to events already applied).
+        """
+        seen: Dict[str, int] = defaultdict(int)
+        pending: Dict[str, List[LinkEvent]] = defaultdict(list)
+        counts: Dict[str, Dict[str, int]] = defaultdict(dict)
+        applied_days: Dict[str, Dict[str, int]] = defaultdict(dict)
+        for ev in self.events.iter_events(end=end):
+            uid = ev.user_id
+            n = seen[uid]
+            seen[uid] += 1
+            if n >= applied.get(uid, 0):
+                pending[uid].append(ev)
+            if uid not in tracked or n < starts.get(uid, 0):
+                continue
+            days = counts[uid]
+            days[ev.date] = days.get(ev.date, 0) + 1
+            if n < applied.get(uid, 0):
+                days = applied_days[uid]
+                days[ev.date] = days.get(ev.date, 0) + 1
+        return pending, counts, applied_days
+
+    def _seed_bases(self, user_ids: List[str],
+                    applied_days: Dict[str, Dict[str, int]]) -> dict:
+        """
+        Blocking: per user, the links in their workbook that no applied
+        event accounts for (recorded before the event log existed).
+        """
+        bases = {}
+        for uid in user_ids:
+            user = self.storage.get_user(uid)
+            if user is None:
+                continue
+            try:
+                with self.workbooks.locks.user(uid):
+                    path = excel_utils.get_user_excel_path(user.username)
+                    days = excel_utils.count_links_by_date(path) if path else {}
+            except Exception as e:
+                print(f"⚠️ Could not count {user.username}'s report: {e}")
+                continue
+            logged = applied_days.get(uid, {})
+            bases[uid] = {
+                day: n - logged.get(day, 0)
+                for day, n in days.items() if n > logged.get(day, 0)
+            }
+        return bases
+
+    async def recount_counters(self) -> int:
+        """Recount the reply counters from the log; returns users corrected."""
+        tracked = {user.key for user in self.storage.list_users()}
+        starts, applied = dict(self._starts), dict(self._applied)
+        end = self.counters.begin_recount()
+        try:
+            _, counts, _ = await asyncio.to_thread(self._scan, end, tracked,
+                                                   starts, applied)
+        except BaseException:
+            self.counters.cancel_recount()
+            raise
+        return self.counters.finish_recount(counts, {})
+
+    async def start(self):
+        await asyncio.to_thread(self.load)
+        for user_id in self._pending:
+            self._schedule(user_id)
+
+    def close(self):
+        """Cancel lazy refreshes; pending events are replayed on next start."""
+        for timer in self._timers.values():
+            timer.cancel()
+        self._timers.clear()
+
+    # ---- Ingest side ----
+    def add(self, user_id: str, events: List[LinkEvent]):
+        """Register durably stored events; the workbook catches up lazily."""
+        self._pending.setdefault(user_id, []).extend(events)
+        self._schedule(user_id)
+
+    def _schedule(self, user_id: str):
+        if user_id in self._timers:
+            return
+        loop = asyncio.get_running_loop()
+        self._timers[user_id] = loop.call_later(self.refresh_seconds,
+                                                self._spawn_refresh, user_id)
+
+    def _spawn_refresh(self, user_id: str):
+        self._timers.pop(user_id, None)
+        task = asyncio.create_task(self.refresh(user_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._refresh_done)
+
+    def _refresh_done(self, task: asyncio.Task):
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            print(f"⚠️ Report refresh failed: {task.exception()}")
+
+    def _on_storage_change(self, user_id: str, before, after):
+        if before is None and after is not None:
+            # (Re)added: every event already logged for this id belongs to
+            # an earlier tenure, including stragglers ingested after the
+            # removal. The new workbook starts after them.
+            self._tenures[user_id] += 1
+            stale = self._pending.pop(user_id, [])
+            total = self._applied.get(user_id, 0) + len(stale)
+            if total:
+                self._applied[user_id] = self._starts[user_id] = total
+                self._save_state(*self._state())
+        elif after is None:
+            # User removed: their report was archived as it stood. Count the
+            # unmaterialized events as consumed so they are not replayed into
+            # a future workbook for the same id.
+            dropped = self._pending.pop(user_id, [])
+            timer = self._timers.pop(user_id, None)
+            if timer is not None:
+                timer.cancel()
+            if dropped:
+                self._applied[user_id] = (self._applied.get(user_id, 0) +
+                                          len(dropped))
+                self._save_state(*self._state())
+
+    def _state(self) -> tuple:
+        """(version, {user id: [tenure start, applied]}) taken on the loop."""
+        self._state_version += 1
+        return self._state_version, {
+            uid: [self._starts.get(uid, 0), n]
+            for uid, n in self._applied.items()
+        }
+
+    def _save_state(self, version: int, state: Dict[str, list]):
+        """Blocking: write views.json unless a newer state got there first."""
+        with self._state_lock:
+            if version <= self._saved_version:
+                return
+            write_snapshot(self.state_path, state)
+            self._saved_version = version
+
+    # ---- Reader side ----
+    async def refresh(self, user_id: str) -> Optional[Path]:
+        """Bring the user's workbook up to date and return its path."""
+        return await self._sync(user_id, reset=False)
+
+    async def rebuild(self, user_id: str) -> Optional[Path]:
+        """Recreate the user's workbook from scratch out of the event log."""
+        return await self._sync(user_id, reset=True)
+
+    async def refresh_all(self):
+        await asyncio.gather(*(self.refresh(uid) for uid in list(self._pending)),
+                             return_exceptions=True)
+
+    def pending_events(self, user_id: str) -> List[LinkEvent]:
+        """Durable events not yet written to the user's workbook."""
+        return list(self._pending.get(user_id, []))
+
+    def _history(self, user_id: str, start: int,
+                 end: int) -> List[LinkEvent]:
+        """The user's events number `start` to `end` (exclusive) in the log."""
+        out = []
+        seen = 0
+        for ev in self.events.iter_events():
+            if seen >= end:
+                break
+            if ev.user_id == user_id:
+                if seen >= start:
+                    out.append(ev)
+                seen += 1
+        return out
+
+    def _materialize_tracked(self, user_id: str, user: TrackedUser,
+                             events: List[LinkEvent], reset: bool,
+                             tenure: int) -> Optional[Path]:
+        # Runs under the user's lock. /stop and /deleteuser archive the
+        # workbook and remove the user under that same lock; a job queued
+        # behind them must not recreate the file, nor write into the one
+        # of a user set up again meanwhile.
+        if (self.storage.get_user(user_id) is None
+                or self._tenures.get(user_id, 0) != tenure):
+            return None
+        return _materialize(user_id, user, events, reset)
+
+    @timed("reports.sync")
+    async def _sync(self, user_id: str, reset: bool) -> Optional[Path]:
+        # Per user, the log holds `applied` materialized events followed by
+        # the `pending` tail. One sync per user at a time keeps it that way.
+        async with self._locks[user_id]:
+            timer = self._timers.pop(user_id, None)
+            if timer is not None:
+                timer.cancel()
+
+            user = self.storage.get_user(user_id)
+            if user is None:
+                return None
+
+            tenure = self._tenures.get(user_id, 0)
+            pending = list(self._pending.get(user_id, []))
+            applied = self._applied.get(user_id, 0)
+            if reset:
+                batch = await asyncio.to_thread(self._history, user_id,
+                                                self._starts.get(user_id, 0),
+                                                applied + len(pending))
+            elif pending:
+                batch = pending
+            else:
+                return excel_utils.get_user_excel_path(user.username)
+
+            path = await self.workbooks.run(user_id, self._materialize_tracked,
+                                            user_id, user, batch, reset,
+                                            tenure)
+
+            if (self.storage.get_user(user_id) is None
+                    or self._tenures.get(user_id, 0) != tenure):
+                # removed (and maybe set up again) meanwhile: bookkeeping
+                # was settled by _on_storage_change
+                return path
+            # events added while the job ran stay pending for the next sync
+            remaining = self._pending.get(user_id, [])
+            del remaining[:len(pending)]
+            if not remaining:
+                self._pending.pop(user_id, None)
+            self._applied[user_id] = applied + len(pending)
+            await asyncio.to_thread(self._save_state, *self._state())
+            return path
@@ -0,0 +1,39 @@
+"""
+Channel -> user routing table.
+
+Every guild message reaches the on_message listeners, but only messages in
+a tracked user's private channel matter. `ChannelRouter` maps each tracked
+channel id to (user_id, status) so everything else is dropped with one
+dict lookup, before any storage access. It is built once from storage and
+kept in sync through storage change notifications.
+"""
+
+from typing import Dict, Optional, Tuple
+
+from utils.models import TrackedUser, UserStatus
+
+Route = Tuple[str, UserStatus]  # (user_id, status)
+
+
+class ChannelRouter:
+
+    def __init__(self, storage):
+        self._routes: Dict[int, Route] = {}
+        for user in storage.list_users():
+            self._on_storage_change(user.key, None, user)
+        storage.subscribe(self._on_storage_change)
+
+    def _on_storage_change(self, user_id: str, before: Optional[TrackedUser],
+                           after: Optional[TrackedUser]):
+        old = before.channel_id if before else None
+        if old is not None and self._routes.get(old, ("", ""))[0] == user_id:
+            del self._routes[old]
+        if after is not None and after.channel_id is not None:
+            self._routes[after.channel_id] = (user_id, after.status)
+
+    def lookup(self, channel_id: int) -> Optional[Route]:
+        """(user_id, status) owning `channel_id`, or None if untracked."""
+        return self._routes.get(channel_id)
+
+    def __len__(self) -> int:
+        return len(self._routes)
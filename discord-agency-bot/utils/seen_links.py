@@ -0,0 +1,170 @@
+"""
+Already-recorded tweet ids, for duplicate rejection at ingest.
+
+A user reposting a link used to be counted again. `SeenLinks` keeps the
+set of tweet ids recorded per user (or across everyone with
+scope="global") so a repost is spotted with one set lookup, before
+anything is queued.
+
+The sets are folded from the link event log as it is appended to and
+persisted to data/events/seen.json (compact JSON) with the usual
+debounced write-behind, together with the log offset they cover. They are loaded on first use:
+the snapshot plus whatever the log gained after that offset. Without a
+snapshot the log is scanned once; workbooks are never read.
+
+On disk:
+{"offset": int, "users": {"user_id": [tweet_id, ...], ...}}
+"""
+
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+from utils.event_store import LinkEvent, LinkEventStore
+from utils.storage_backends import JsonBackend
+
+DEFAULT_SEEN_PATH = Path("data/events/seen.json")
+SCOPES = ("user", "global")
+
+
+class SeenLinks:
+
+    def __init__(self,
+                 storage,
+                 events: LinkEventStore,
+                 path: str | Path = DEFAULT_SEEN_PATH,
+                 scope: str = "user"):
+        if scope not in SCOPES:
+            raise ValueError(
+                f"Unknown dedupe scope {scope!r}; expected one of {SCOPES}")
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.storage = storage
+        self.events = events
+        self.scope = scope
+
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._offset = 0
+        self._seen: Dict[str, Set[int]] = {}  # recorded, per user
+        self._claimed: Dict[str, Set[int]] = {}  # accepted, not yet written
+        self._global: Set[int] = set()  # seen + claimed, global scope only
+        self._backend = JsonBackend(self.path, indent=None)
+
+        events.subscribe(self._on_append)
+        storage.subscribe(self._on_storage_change)
+
+    # ---- Loading ----
+    def load(self):
+        """Blocking: load now rather than on the first `claim()`."""
+        with self._lock:
+            self._ensure_loaded()
+
+    def _ensure_loaded(self):
+        # caller holds self._lock
+        if self._loaded:
+            return
+        data = self._backend.load()
+        offset = int(data.get("offset") or 0)
+        path = self.events.path
+        size = path.stat().st_size if path.exists() else 0
+        if offset > size:
+            data, offset = {}, 0  # log replaced under us: rescan it
+        self._seen = {
+            uid: set(ids)
+            for uid, ids in (data.get("users") or {}).items()
+        }
+        for ev in self.events.iter_events(offset):
+            self._seen.setdefault(ev.user_id, set()).add(int(ev.tweet_id))
+        tracked = {user.key for user in self.storage.list_users()}
+        for uid in [uid for uid in self._seen if uid not in tracked]:
+            del self._seen[uid]  # removed while the sets were not loaded
+        self._offset = size
+        if self.scope == "global":
+            self._global = set().union(*self._seen.values())
+        self._loaded = True
+        self._backend.attach(self._snapshot)
+
+    def _snapshot(self) -> dict:
+        # claim() takes self._lock on the loop: only copy under it, sort
+        # and serialize after
+        with self._lock:
+            offset = self._offset
+            seen = {uid: ids.copy() for uid, ids in self._seen.items()}
+        return {
+            "offset": offset,
+            "users": {uid: sorted(ids) for uid, ids in seen.items()}
+        }
+
+    # ---- Ingest side ----
+    def claim(self, user_id: str,
+              tweet_ids: Iterable[str]) -> Tuple[List[str], List[str]]:
+        """
+        Split `tweet_ids` into (fresh, duplicates). Fresh ids are reserved
+        for `user_id` right away, so a repost arriving before the first copy
+        is written is still a duplicate; `release()` them if the write fails.
+        """
+        fresh, duplicates = [], []
+        with self._lock:
+            self._ensure_loaded()
+            seen = self._seen.get(user_id, ())
+            claimed = self._claimed.setdefault(user_id, set())
+            for tweet_id in tweet_ids:
+                key = int(tweet_id)
+                if self.scope == "global":
+                    taken = key in self._global
+                else:
+                    taken = key in seen or key in claimed
+                if taken:
+                    duplicates.append(tweet_id)
+                    continue
+                claimed.add(key)
+                if self.scope == "global":
+                    self._global.add(key)
+                fresh.append(tweet_id)
+        return fresh, duplicates
+
+    def release(self, user_id: str, tweet_ids: Iterable[str]):
+        """Give back ids claimed for a write that failed."""
+        with self._lock:
+            claimed = self._claimed.get(user_id, set())
+            seen = self._seen.get(user_id, ())
+            for tweet_id in tweet_ids:
+                key = int(tweet_id)
+                if key in claimed:
+                    claimed.discard(key)
+                    if self.scope == "global" and key not in seen:
+                        self._global.discard(key)
+
+    def _on_append(self, events: List[LinkEvent], end_offset: int):
+        # runs on the executor under the event log's append lock
+        with self._lock:
+            if not self._loaded:
+                return  # the first load reads these from the log
+            for ev in events:
+                key = int(ev.tweet_id)
+                self._seen.setdefault(ev.user_id, set()).add(key)
+                self._claimed.get(ev.user_id, set()).discard(key)
+                if self.scope == "global":
+                    self._global.add(key)
+            self._offset = end_offset
+        self._backend.record([])
+
+    def _on_storage_change(self, user_id: str, before, after):
+        if after is not None:
+            return
+        # user removed: their reposts start fresh if they are set up again
+        with self._lock:
+            dropped = self._seen.pop(user_id, set())
+            dropped |= self._claimed.pop(user_id, set())
+            if self.scope == "global":
+                self._global -= dropped
+        if dropped:
+            self._backend.record([])
+
+    # ---- Persistence ----
+    def flush(self):
+        self._backend.flush()
+
+    def close(self):
+        self._backend.close()
@@ -0,0 +1,407 @@
+"""
+Persistence backends for `Storage`.
+
+`Storage` keeps the whole roster in memory and hands every mutation to a
+backend, which decides how it reaches disk:
+
+- JsonBackend    : rewrites users.json (debounced write-behind)
+- JournalBackend : appends one record per mutation to users.json.journal and
+                   compacts it into users.json in the background
+- SqliteBackend  : upserts each mutation into users.db (WAL mode)
+
+A backend implements:
+    load() -> dict                          full data, called once at startup
+    attach(snapshot)                        callable returning a consistent copy
+    record(changes)                         [(user_id, udata | None), ...]
+    replace(data)                           whole-roster overwrite (save_users)
+    flush()                                 force pending writes to disk
+    close()
+`record` is called with the storage lock held, in mutation order.
+"""
+
+import json
+import os
+import sqlite3
+import threading
+from pathlib import Path
+from typing import Callable, Optional
+
+# Seconds a mutation may sit in memory before the write-behind flusher
+# persists it. Mutations arriving within the window share one file write.
+FLUSH_DELAY_SECONDS = 2.0
+
+# Journal records appended before a background compaction is started.
+COMPACT_EVERY = 500
+
+Snapshot = Callable[[], dict]
+Changes = list[tuple[str, Optional[dict]]]
+
+
+def read_snapshot(path: Path) -> dict:
+    """
+    Read a users.json snapshot. A missing file is an empty roster; a corrupt
+    one raises instead of silently starting from `{}` and wiping every user
+    on the next write.
+    """
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        raise RuntimeError(f"Storage file {path} is corrupt: {e}") from e
+
+
+def read_roster(path: str | Path) -> dict:
+    """
+    Read-only view of a JSON/journal roster: the snapshot with any pending
+    journal records applied. Nothing on disk is modified.
+    """
+    path = Path(path)
+    data = read_snapshot(path)
+    for suffix in (".journal.old", ".journal"):
+        JournalBackend._replay(path.with_name(path.name + suffix), data)
+    return data
+
+
+def write_snapshot(path: Path, data: dict, indent: Optional[int] = 2):
+    """
+    Write `data` atomically: temp file + fsync + rename over `path`;
+    `indent=None` writes compact JSON (large machine-only files).
+    """
+    # per-thread temp name: concurrent writers never rename each other's file
+    tmp = path.with_name(f"{path.name}.{threading.get_ident()}.tmp")
+    separators = (",", ":") if indent is None else None
+    with open(tmp, "w") as f:
+        json.dump(data, f, indent=indent, separators=separators,
+                  sort_keys=True)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class JsonBackend:
+    """Whole-file snapshots written by a debounced background timer."""
+
+    def __init__(self,
+                 path: str | Path,
+                 flush_delay: float = FLUSH_DELAY_SECONDS,
+                 indent: Optional[int] = 2):
+        self.path = Path(path)
+        self.flush_delay = flush_delay
+        self.indent = indent
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._io_lock = threading.Lock()
+        self._flush_timer: Optional[threading.Timer] = None
+        self._dirty = False
+
+    def load(self) -> dict:
+        # A journal left by JournalBackend holds changes users.json lacks:
+        # fold it in and drop it, or a later journal run would replay its
+        # stale records over the newer snapshots written here.
+        data = read_roster(self.path)
+        journals = [
+            self.path.with_name(self.path.name + suffix)
+            for suffix in (".journal.old", ".journal")
+        ]
+        if not self.path.exists() or any(j.exists() for j in journals):
+            write_snapshot(self.path, data)
+            for journal in journals:
+                journal.unlink(missing_ok=True)
+        return data
+
+    def attach(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+
+    def record(self, changes: Changes):
+        with self._lock:
+            self._dirty = True
+            if self._flush_timer is None:
+                self._flush_timer = threading.Timer(self.flush_delay,
+                                                    self.flush)
+                self._flush_timer.daemon = True
+                self._flush_timer.start()
+
+    def replace(self, data: dict):
+        self.record([])
+
+    def flush(self):
+        with self._io_lock:
+            with self._lock:
+                if self._flush_timer is not None:
+                    self._flush_timer.cancel()
+                    self._flush_timer = None
+                if not self._dirty or self._snapshot is None:
+                    return
+                self._dirty = False
+            write_snapshot(self.path, self._snapshot(), self.indent)
+
+    def close(self):
+        self.flush()
+
+
+class JournalBackend:
+    """
+    Append-only journal of full-record puts/deletes on top of a snapshot.
+
+    Each mutation is one JSON line, flushed and fsynced before returning, so
+    per-write cost is O(1) and a crash loses at most the line being written
+    (a torn trailing line is ignored on replay). That fsync runs on the
+    caller's thread, the event loop for cogs: roster mutations are rare
+    (setup, removal, cleanup batches), one fsync each, and timed as
+    `storage.write`. Every `compact_every`
+    records a background thread rotates the journal to `.old`, writes a fresh
+    snapshot with temp-file + rename and deletes `.old`. Records are full
+    states, so replaying them over a snapshot that is already newer is
+    harmless; that makes every crash point during compaction recoverable.
+    """
+
+    def __init__(self, path: str | Path, compact_every: int = COMPACT_EVERY):
+        self.path = Path(path)
+        self.journal_path = self.path.with_name(self.path.name + ".journal")
+        self.old_journal_path = self.path.with_name(self.path.name +
+                                                    ".journal.old")
+        self.compact_every = compact_every
+        self._snapshot: Optional[Snapshot] = None
+        self._lock = threading.Lock()
+        self._journal = None
+        self._records = 0
+        self._compactor: Optional[threading.Thread] = None
+
+    # ---- Startup ----
+    def load(self) -> dict:
+        data = read_snapshot(self.path)
+        replayed = 0
+        for journal in (self.old_journal_path, self.journal_path):
+            replayed += self._replay(journal, data)
+
+        # Fold whatever was replayed into a fresh snapshot before accepting
+        # new writes, so the journal always starts empty.
+        if replayed or not self.path.exists() or self.old_journal_path.exists():
+            write_snapshot(self.path, data)
+        self._journal = open(self.journal_path, "w")
+        self.old_journal_path.unlink(missing_ok=True)
+        return data
+
+    @staticmethod
+    def _replay(journal: Path, data: dict) -> int:
+        if not journal.exists():
+            return 0
+        count = 0
+        with open(journal, "r") as f:
+            for lineno, line in enumerate(f, start=1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rec = json.loads(line)
+                except ValueError:
+                    print(f"⚠️ Skipping torn journal record "
+                          f"{journal}:{lineno}")
+                    continue
+                op, uid = rec.get("op"), str(rec.get("id"))
+                if op == "put":
+                    data[uid] = rec["data"]
+                elif op == "del":
+                    data.pop(uid, None)
+                count += 1
+        return count
+
+    def attach(self, snapshot: Snapshot):
+        self._snapshot = snapshot
+
+    # ---- Writes ----
+    def record(self, changes: Changes):
+        if not changes:
+            return
+        lines = []
+        for uid, udata in changes:
+            if udata is None:
+                rec = {"op": "del", "id": uid}
+            else:
+                rec = {"op": "put", "id": uid, "data": udata}
+            lines.append(json.dumps(rec, separators=(",", ":")) + "\n")
+        with self._lock:
+            self._journal.write("".join(lines))
+            self._journal.flush()
+            os.fsync(self._journal.fileno())
+            self._records += len(lines)
+            if (self._records >= self.compact_every
+                    and self._compactor is None):
+                self._compactor = threading.Thread(target=self._compact,
+                                                   name="storage-compactor",
+                                                   daemon=True)
+                self._compactor.start()
+
+    def replace(self, data: dict):
+        # A whole-roster overwrite is a snapshot; skip the journal entirely.
+        with self._lock:
+            write_snapshot(self.path, data)
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            self._records = 0
+
+    # ---- Compaction ----
+    def _compact(self):
+        try:
+            with self._lock:
+                self._journal.close()
+                os.replace(self.journal_path, self.old_journal_path)
+                self._journal = open(self.journal_path, "w")
+                self._records = 0
+            # Taken after the rotation, so it covers everything in `.old`.
+            write_snapshot(self.path, self._snapshot())
+            self.old_journal_path.unlink(missing_ok=True)
+        except Exception as e:
+            print(f"⚠️ Storage compaction failed: {e}")
+        finally:
+            with self._lock:
+                self._compactor = None
+
+    def flush(self):
+        # Every record is fsynced on write; nothing is pending.
+        pass
+
+    def close(self):
+        compactor = self._compactor
+        if compactor is not None:
+            compactor.join()
+        with self._lock:
+            if self._journal is None or self._journal.closed:
+                return
+            pending = self._journal.tell() > 0
+            self._journal.close()
+            if pending:
+                os.replace(self.journal_path, self.old_journal_path)
+        # Leave users.json complete on its own: another backend, the
+        # migration tool or an older build may read it without the journal.
+        if pending and self._snapshot is not None:
+            write_snapshot(self.path, self._snapshot())
+            self.old_journal_path.unlink(missing_ok=True)
+
+
+class SqliteBackend:
+    """
+    One row per user in users.db, written in WAL mode so each mutation is a
+    small indexed upsert instead of a file rewrite. `channel_id` and
+    `status` are indexed for lookups outside the resident model (the
+    migration tool, ad-hoc queries). Keys outside the known columns, set via
+    `Storage.update_user(**kwargs)`, are kept as JSON in `extra`.
+
+    Addressed by its users.json path (as Storage does), an empty database
+    first imports that JSON/journal roster, so switching STORAGE_BACKEND
+    without running utils.migrate_storage doesn't start from no users.
+    """
+
+    COLUMNS = ("channel_id", "username", "replies_per_day", "start_date",
+               "status")
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS users (
+            user_id         TEXT PRIMARY KEY,
+            channel_id      TEXT NOT NULL DEFAULT '',
+            username        TEXT NOT NULL DEFAULT '',
+            replies_per_day INTEGER NOT NULL DEFAULT 0,
+            start_date      TEXT,
+            status          TEXT NOT NULL DEFAULT 'pending',
+            extra           TEXT
+        );
+        CREATE INDEX IF NOT EXISTS idx_users_channel_id ON users(channel_id);
+        CREATE INDEX IF NOT EXISTS idx_users_status ON users(status);
+    """
+
+    def __init__(self, path: str | Path):
+        path = Path(path)
+        # Storage is addressed by its users.json path; keep the db beside it.
+        self.path = path if path.suffix == ".db" else path.with_suffix(".db")
+        self.source = None if path.suffix == ".db" else path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(self.path,
+                                     check_same_thread=False,
+                                     isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    def load(self) -> dict:
+        data = {}
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT user_id, channel_id, username, replies_per_day, "
+                "start_date, status, extra FROM users").fetchall()
+        for uid, *values, extra in rows:
+            udata = dict(zip(self.COLUMNS, values))
+            if extra:
+                udata.update(json.loads(extra))
+            data[uid] = udata
+        if not data and self.source is not None:
+            data = read_roster(self.source)
+            if data:
+                self.replace(data)
+                print(f"📥 Imported {len(data)} user(s) from {self.source} "
+                      f"into {self.path}")
+        return data
+
+    def attach(self, snapshot: Snapshot):
+        pass
+
+    def _row(self, uid: str, udata: dict) -> tuple:
+        extra = {k: v for k, v in udata.items() if k not in self.COLUMNS}
+        return (uid, str(udata.get("channel_id") or ""),
+                str(udata.get("username") or ""),
+                int(udata.get("replies_per_day") or 0),
+                udata.get("start_date"), udata.get("status") or "pending",
+                json.dumps(extra) if extra else None)
+
+    def _apply(self, changes: Changes):
+        puts = [self._row(uid, u) for uid, u in changes if u is not None]
+        dels = [(uid, ) for uid, u in changes if u is None]
+        if puts:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO users (user_id, channel_id, username, "
+                "replies_per_day, start_date, status, extra) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)", puts)
+        if dels:
+            self._conn.executemany("DELETE FROM users WHERE user_id = ?",
+                                   dels)
+
+    def record(self, changes: Changes):
+        if not changes:
+            return
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._apply(changes)
+
+    def replace(self, data: dict):
+        with self._lock:
+            with self._conn:
+                self._conn.execute("BEGIN")
+                self._conn.execute("DELETE FROM users")
+                self._apply(list(data.items()))
+
+    def flush(self):
+        # Each mutation is committed on write; nothing is pending.
+        pass
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+BACKENDS = {
+    "json": JsonBackend,
+    "journal": JournalBackend,
+    "sqlite": SqliteBackend,
+}
+
+
+def make_backend(kind: str, path: str | Path):
+    try:
+        cls = BACKENDS[kind.lower()]
+    except KeyError:
+        raise ValueError(
+            f"Unknown storage backend {kind!r} (expected one of: "
+            f"{', '.join(BACKENDS)})") from None
+    return cls(path)
@@ -1,15 +1,24 @@
-import json
+import atexit
+import threading
 from pathlib import Path
-from datetime import datetime
-from typing import Optional, List, Tuple
+from typing import Callable, Dict, Iterable, Optional, List, Tuple
+
+from utils.metrics import METRICS
+from utils.models import TrackedUser, UserStatus
+from utils.storage_backends import make_backend
 
 DEFAULT_PATH = Path("data/users.json")
+DEFAULT_BACKEND = "json"
+
+# listener(user_id, before, after); before/after are None on add/remove
+ChangeListener = Callable[
+    [str, Optional[TrackedUser], Optional[TrackedUser]], None]
 
 
 class Storage:
     """
-    JSON-backed storage.
-    Data shape:
+    User roster storage.
+    Persisted shape:
     {
       "user_id": {
          "channel_id": "...",
@@ -20,24 +29,110 @@ class Storage:
       },
       ...
     }
+
+    The data is loaded once into `TrackedUser` records (utils/models.py);
+    reads return those shared, read-only records from a resident model
+    indexed by discord id and channel id. Every mutation is handed to a
+    persistence backend (see utils/storage_backends.py): "json" rewrites
+    users.json via a debounced write-behind timer, "journal" appends one
+    record per mutation and compacts in the background, "sqlite" upserts
+    rows into users.db. `flush()` forces pending writes and is also run at
+    interpreter exit.
+
+    Listeners registered with `subscribe()` are called after every mutation
+    so caches derived from storage stay valid without re-reading the file.
     """
 
-    def __init__(self, path: str | Path = DEFAULT_PATH):
+    def __init__(self,
+                 path: str | Path = DEFAULT_PATH,
+                 backend=None,
+                 lock=None):
         self.path = Path(path)
         self.path.parent.mkdir(parents=True, exist_ok=True)
-        if not self.path.exists():
-            self._write({})
 
-    def _read(self) -> dict:
-        try:
-            with open(self.path, "r") as f:
-                return json.load(f)
-        except Exception:
-            return {}
+        # writer lock: pass bot.locks.storage to share it with other code
+        self._lock = lock or threading.RLock()
+        self._users: dict[str, TrackedUser] = {}
+        self._by_channel: dict[int, str] = {}
+        self._listeners: list[ChangeListener] = []
+
+        if backend is None or isinstance(backend, str):
+            backend = make_backend(backend or DEFAULT_BACKEND, self.path)
+        self._backend = backend
+        with METRICS.timer("storage.load"):
+            self._load(self._backend.load())
+        self._backend.attach(self._snapshot)
+        atexit.register(self.flush)
+
+    # ---- In-memory model ----
+    def _load(self, data: dict):
+        with self._lock:
+            self._users = {}
+            self._by_channel = {}
+            for uid, udata in data.items():
+                self._put(str(uid), TrackedUser.from_dict(uid, udata))
+
+    def _put(self, user_id: str, user: TrackedUser):
+        old = self._users.get(user_id)
+        if old is not None and self._by_channel.get(old.channel_id) == user_id:
+            del self._by_channel[old.channel_id]
+        self._users[user_id] = user
+        if user.channel_id:
+            self._by_channel[user.channel_id] = user_id
+
+    def _snapshot(self) -> dict:
+        with self._lock:
+            return {uid: u.to_dict() for uid, u in self._users.items()}
 
-    def _write(self, data: dict):
-        with open(self.path, "w") as f:
-            json.dump(data, f, indent=2, sort_keys=True)
+    def _drop(self, user_id: str) -> bool:
+        old = self._users.pop(user_id, None)
+        if old is None:
+            return False
+        if self._by_channel.get(old.channel_id) == user_id:
+            del self._by_channel[old.channel_id]
+        return True
+
+    def _record(self, changes: list):
+        with METRICS.timer("storage.write"):
+            self._backend.record(changes)
+
+    def _commit(self, users: List[Tuple[str, TrackedUser]]) -> list:
+        """Store `users` and hand them to the backend in one write."""
+        changes = []
+        for user_id, user in users:
+            changes.append((user_id, self._users.get(user_id), user))
+            self._put(user_id, user)
+        if changes:
+            self._record([(uid, user.to_dict()) for uid, _, user in changes])
+        return changes
+
+    # ---- Change notifications ----
+    def subscribe(self, listener: ChangeListener):
+        if listener not in self._listeners:
+            self._listeners.append(listener)
+
+    def unsubscribe(self, listener: ChangeListener):
+        if listener in self._listeners:
+            self._listeners.remove(listener)
+
+    def _notify(self, changes: list[tuple[str, Optional[TrackedUser],
+                                          Optional[TrackedUser]]]):
+        for listener in list(self._listeners):
+            for user_id, before, after in changes:
+                try:
+                    listener(user_id, before, after)
+                except Exception as e:
+                    print(f"⚠️ Storage listener {listener!r} failed: {e}")
+
+    # ---- Persistence ----
+    def flush(self):
+        """Write pending mutations to disk now."""
+        with METRICS.timer("storage.flush"):
+            self._backend.flush()
+
+    def close(self):
+        atexit.unregister(self.flush)
+        self._backend.close()
 
     # ---- Create / modify ----
     def add_user(self,
@@ -46,133 +141,155 @@ class Storage:
                  username: str,
                  replies_per_day: int,
                  status: str = "active",
-                 start_date: Optional[str] = None):
-        data = self._read()
-        data[user_id] = {
-            "channel_id": str(channel_id),
-            "username": str(username),
-            "replies_per_day": int(replies_per_day),
-            "start_date": start_date or datetime.utcnow().date().isoformat(),
-            "status": status
-        }
-        self._write(data)
+                 start_date=None):
+        user_id = str(user_id)
+        user = TrackedUser(user_id, channel_id, username, replies_per_day,
+                           start_date, status)
+        with self._lock:
+            changes = self._commit([(user_id, user)])
+        self._notify(changes)
+
+    def add_users(self, users: Dict[str, dict]):
+        """
+        Add or overwrite several users in one backend write. `users` maps
+        user_id -> add_user() keyword arguments (without user_id).
+        """
+        records = [(str(uid), TrackedUser(uid, **fields))
+                   for uid, fields in users.items()]
+        with self._lock:
+            changes = self._commit(records)
+        self._notify(changes)
 
     def set_user(self,
                  discord_id: str,
                  channel_id: Optional[str] = None,
                  username: Optional[str] = None,
                  replies_per_day: Optional[int] = None,
-                 start_date: Optional[str] = None,
+                 start_date=None,
                  status: Optional[str] = None):
-        data = self._read()
-        if discord_id not in data:
-            # initialize with defaults to ensure consistent shape
-            data[discord_id] = {
-                "channel_id": "",
-                "username": f"user_{discord_id}",
-                "replies_per_day": 0,
-                "start_date": datetime.utcnow().date().isoformat(),
-                "status": "pending"
-            }
-        if channel_id is not None:
-            data[discord_id]["channel_id"] = str(channel_id)
-        if username is not None:
-            data[discord_id]["username"] = str(username)
-        if replies_per_day is not None:
-            data[discord_id]["replies_per_day"] = int(replies_per_day)
-        if start_date is not None:
-            data[discord_id]["start_date"] = start_date
-        if status is not None:
-            data[discord_id]["status"] = status
-        self._write(data)
+        discord_id = str(discord_id)
+        fields = {
+            k: v
+            for k, v in (("channel_id", channel_id), ("username", username),
+                         ("replies_per_day", replies_per_day),
+                         ("start_date", start_date), ("status", status))
+            if v is not None
+        }
+        with self._lock:
+            # a new user starts from the defaults: pending, no channel, today
+            current = self._users.get(discord_id) or TrackedUser(discord_id)
+            changes = self._commit([(discord_id, current.replace(**fields))])
+        self._notify(changes)
 
     # ---- Read helpers ----
-    def get_user(self, user_id: str) -> Optional[dict]:
-        data = self._read()
-        return data.get(user_id)
+    def get_user(self, user_id) -> Optional[TrackedUser]:
+        return self._users.get(str(user_id))
 
-    def get_user_by_discord_id(
-            self,
-            discord_id: str) -> Optional[Tuple[str, str, str, int, str, str]]:
-        """
-        Return a tuple (user_id, channel_id, username, replies_per_day, start_date, status)
-        This keeps compatibility with code that expects a 6-value row.
-        """
-        data = self._read()
-        udata = data.get(str(discord_id))
-        if not udata:
+    def get_user_by_channel(self, channel_id) -> Optional[TrackedUser]:
+        try:
+            uid = self._by_channel.get(int(channel_id))
+        except (TypeError, ValueError):
             return None
-        return (str(discord_id), udata.get("channel_id", ""),
-                udata.get("username", f"user_{discord_id}"),
-                int(udata.get("replies_per_day", 0) or 0),
-                udata.get("start_date",
-                          datetime.utcnow().date().isoformat()),
-                udata.get("status", "pending"))
-
-    def get_user_by_channel(self,
-                            channel_id: str) -> Optional[Tuple[str, dict]]:
-        data = self._read()
-        for uid, udata in data.items():
-            if str(udata.get("channel_id")) == str(channel_id):
-                return uid, udata
-        return None
+        return self._users.get(uid) if uid is not None else None
 
     # ---- Update / remove ----
     def update_user(self, user_id: str, **kwargs):
-        data = self._read()
-        if user_id in data:
-            data[user_id].update(kwargs)
-            self._write(data)
+        user_id = str(user_id)
+        with self._lock:
+            before = self._users.get(user_id)
+            if before is None:
+                return
+            changes = self._commit([(user_id, before.replace(**kwargs))])
+        self._notify(changes)
 
     def update_replies_per_day(self, user_id: str, replies_per_day: int):
         """Convenience method used by /settarget"""
-        data = self._read()
-        if user_id in data:
-            data[user_id]["replies_per_day"] = int(replies_per_day)
-            self._write(data)
+        self.update_user(user_id, replies_per_day=int(replies_per_day))
 
     def pause_user(self, user_id: str):
-        self.set_user(discord_id=user_id, status="paused")
+        self.set_user(discord_id=user_id, status=UserStatus.PAUSED)
 
     def resume_user(self, user_id: str):
-        self.set_user(discord_id=user_id, status="active")
+        self.set_user(discord_id=user_id, status=UserStatus.ACTIVE)
 
     def remove_user(self, user_id: str):
-        data = self._read()
-        if user_id in data:
-            del data[user_id]
-            self._write(data)
+        user_id = str(user_id)
+        with self._lock:
+            before = self._users.get(user_id)
+            if not self._drop(user_id):
+                return
+            self._record([(user_id, None)])
+        self._notify([(user_id, before, None)])
+
+    def remove_users(self, user_ids: Iterable[str]) -> List[str]:
+        """Remove several users in one backend write; returns those removed."""
+        changes = []
+        with self._lock:
+            for user_id in dict.fromkeys(str(uid) for uid in user_ids):
+                before = self._users.get(user_id)
+                if self._drop(user_id):
+                    changes.append((user_id, before, None))
+            if changes:
+                self._record([(uid, None) for uid, _, _ in changes])
+        self._notify(changes)
+        return [uid for uid, _, _ in changes]
 
     # ---- Listing ----
-    def list_users(self) -> List[Tuple[str, str, str, int, str, str]]:
-        data = self._read()
-        out = []
-        for uid, udata in data.items():
-            out.append(
-                (uid, udata.get("channel_id"), udata.get("username"),
-                 int(udata.get("replies_per_day", 0)
-                     or 0), udata.get("start_date"), udata.get("status")))
-        return out
-
-    # ---- raw load/save (compat) ----
+    def list_users(self) -> List[TrackedUser]:
+        with self._lock:
+            return list(self._users.values())
+
+    # ---- raw load/save (compat; the persisted dict shape) ----
     def load_users(self) -> dict:
-        return self._read()
+        return self._snapshot()
 
     def save_users(self, users: dict):
-        self._write(users)
+        with self._lock:
+            old = self._users
+            self._load(users)
+            new = self._users
+            self._backend.replace(self._snapshot())
+        changes = []
+        for uid in old.keys() | new.keys():
+            before, after = old.get(uid), new.get(uid)
+            if before != after:
+                changes.append((uid, before, after))
+        self._notify(changes)
 
 
-# Compatibility helpers for older code
-_default_storage = Storage(DEFAULT_PATH)
+# One resident instance per file; separate instances would each hold their
+# own copy of the model and overwrite each other's changes.
+_instances: dict[Path, Storage] = {}
+_instances_lock = threading.Lock()
 
 
-def load_users() -> dict:
-    return _default_storage.load_users()
+def get_storage_instance(path: str | Path = DEFAULT_PATH,
+                         backend: Optional[str] = None,
+                         lock=None) -> Storage:
+    """
+    Return the resident Storage for `path`. `backend` and `lock` only matter
+    for the first call, which creates the instance.
+    """
+    key = Path(path).resolve()
+    with _instances_lock:
+        inst = _instances.get(key)
+        if inst is None:
+            inst = _instances[key] = Storage(path, backend=backend, lock=lock)
+        return inst
 
 
-def save_users(users: dict):
-    return _default_storage.save_users(users)
+def flush_all():
+    """Force every resident Storage to write pending changes (shutdown hook)."""
+    with _instances_lock:
+        instances = list(_instances.values())
+    for inst in instances:
+        inst.flush()
 
 
-def get_storage_instance(path: str | Path = DEFAULT_PATH) -> Storage:
-    return Storage(path)
+# Compatibility helpers for older code; they share the bot's instance.
+def load_users() -> dict:
+    return get_storage_instance(DEFAULT_PATH).load_users()
+
+
+def save_users(users: dict):
+    return get_storage_instance(DEFAULT_PATH).save_users(users)
@@ -0,0 +1,66 @@
+"""
+Workbook executor.
+
+openpyxl loads and saves are blocking; run on the event loop they stall
+heartbeats, other users' messages and slash commands. `WorkbookExecutor`
+runs them on a bounded thread pool instead. Jobs that share a key (the
+user id) run one at a time in submission order, so two batches from the
+same user can never interleave a load -> modify -> save of one workbook.
+
+Keys are locks of the shared `LockManager` (bot.locks) and stay held while
+the job runs, so code elsewhere that takes `locks.user(user_id)`, on the
+loop or in a thread, never overlaps that user's workbook jobs. The key is
+released when the job finishes, not when its caller stops waiting: a
+cancelled caller leaves the thread running, and the next job for that
+user must not start until it is done.
+"""
+
+import asyncio
+import functools
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Optional
+
+from utils.locks import LockManager
+from utils.metrics import METRICS
+
+DEFAULT_WORKERS = 4
+
+
+class WorkbookExecutor:
+
+    def __init__(self,
+                 max_workers: int = DEFAULT_WORKERS,
+                 locks: Optional[LockManager] = None):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers,
+                                        thread_name_prefix="workbook")
+        self.locks = locks or LockManager()
+
+    async def run(self, key: str, fn: Callable[..., Any], *args,
+                  **kwargs) -> Any:
+        """Run `fn(*args, **kwargs)` in the pool after earlier jobs for `key`."""
+        # HybridLock serves waiters FIFO, which gives per-key ordering.
+        queued = time.perf_counter()
+        guard = self.locks.key(key)
+        await guard.acquire_async()
+        started = time.perf_counter()
+        METRICS.observe("workbooks.wait", started - queued)
+        try:
+            loop = asyncio.get_running_loop()
+            job = loop.run_in_executor(self._pool,
+                                       functools.partial(fn, *args, **kwargs))
+        except BaseException:
+            guard.release()
+            raise
+
+        def done(_):
+            METRICS.observe("workbooks.job", time.perf_counter() - started)
+            guard.release()
+
+        job.add_done_callback(done)
+        # cancelling the caller must not cancel (and unlock) the running job
+        return await asyncio.shield(job)
+
+    def shutdown(self, wait: bool = True):
+        """Stop accepting jobs; with `wait`, let in-flight writes finish."""
+        self._pool.shutdown(wait=wait)
@@ -0,0 +1,46 @@
+"""
+X/Twitter status link extraction.
+
+Every message in an active user's channel is scanned for reply links.
+Links are canonicalized to the tweet id, so the same reply pasted as
+x.com, twitter.com, mobile.twitter.com, an fxtwitter/vxtwitter embed
+link, an /i/web/status link or with a ?s=20 share suffix counts once.
+
+Matches look like:
+    https://x.com/someone/status/1790000000000000000
+    https://mobile.twitter.com/someone/status/1790000000000000000?s=20
+    https://vxtwitter.com/someone/status/1790000000000000000/photo/1
+    https://twitter.com/i/web/status/1790000000000000000
+"""
+
+import re
+from typing import List
+
+# Cheap pre-check: most channel messages carry no status link at all.
+STATUS_MARKER = "/status/"
+
+# Case-sensitive like the pattern it replaces: share sheets and clients
+# emit lowercase hosts, and IGNORECASE costs ~60% more per scanned message.
+X_STATUS_RE = re.compile(
+    r"https?://"
+    r"(?:(?:www|mobile)\.)?"
+    r"(?:twitter|x|fxtwitter|vxtwitter|fixupx|fixvx)\.com/"
+    r"(?:i/web|[A-Za-z0-9_]{1,15})"
+    r"/status/([0-9]{1,20})")
+
+
+def extract_tweet_ids(text: str, limit: int | None = None) -> List[str]:
+    """
+    Tweet ids linked from `text`, in order of first appearance and without
+    repeats; at most `limit` of them when given.
+    """
+    if not text or STATUS_MARKER not in text:
+        return []
+
+    ids = list(dict.fromkeys(X_STATUS_RE.findall(text)))
+    return ids[:limit] if limit is not None else ids
+
+
+def canonical_url(tweet_id: str) -> str:
+    """The one URL recorded for a tweet, whatever form it was pasted in."""
+    return f"https://x.com/i/status/{tweet_id}"